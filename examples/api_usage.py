@@ -5,24 +5,64 @@ Przykład użycia API twinshare do zarządzania maszynami wirtualnymi i siecią
 """
 
 import asyncio
+import functools
+import io
 import json
+import sys
 from src.api import API
 
+
+try:
+    import orjson
+
+    def jdump(obj):
+        """Zwraca obiekt sformatowany jako czytelny JSON."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def jdump(obj):
+        """Zwraca obiekt sformatowany jako czytelny JSON."""
+        return json.dumps(obj, indent=2)
+
+
+def show(obj, out):
+    """Wypisuje obiekt jako czytelny JSON."""
+    print(jdump(obj), file=out)
+
+
+def buffered(fn):
+    """
+    Zbiera wyjście przykładu w buforze i wypisuje je jednym zapisem.
+
+    Przykłady wykonywane współbieżnie nie przeplatają wtedy swojego wyjścia.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        out = io.StringIO()
+        try:
+            return await fn(*args, out=out, **kwargs)
+        finally:
+            sys.stdout.write(out.getvalue())
+
+    return wrapper
+
+
 # Inicjalizacja głównego API
 api = API()
 
 
-async def vm_management_example():
+@buffered
+async def vm_management_example(*, out):
     """Przykład zarządzania maszynami wirtualnymi."""
-    print("=== Przykład zarządzania maszynami wirtualnymi ===")
+    print("=== Przykład zarządzania maszynami wirtualnymi ===", file=out)
     
     # Listowanie maszyn wirtualnych
-    print("\n1. Listowanie maszyn wirtualnych:")
+    print("\n1. Listowanie maszyn wirtualnych:", file=out)
     vms = api.vm.list_vms()
-    print(json.dumps(vms, indent=2))
+    show(vms, out)
     
     # Tworzenie maszyny wirtualnej
-    print("\n2. Tworzenie maszyny wirtualnej:")
+    print("\n2. Tworzenie maszyny wirtualnej:", file=out)
     try:
         vm = api.vm.create_vm(
             name="example-vm",
@@ -31,145 +71,139 @@ async def vm_management_example():
             memory=2048,
             disk_size=20
         )
-        print(json.dumps(vm, indent=2))
+        show(vm, out)
     except Exception as e:
-        print(f"Błąd podczas tworzenia maszyny wirtualnej: {e}")
+        print(f"Błąd podczas tworzenia maszyny wirtualnej: {e}", file=out)
     
     # Pobieranie statusu maszyny wirtualnej
-    print("\n3. Pobieranie statusu maszyny wirtualnej:")
+    print("\n3. Pobieranie statusu maszyny wirtualnej:", file=out)
     try:
         status = api.vm.get_vm_status("example-vm")
-        print(json.dumps(status, indent=2))
+        show(status, out)
     except Exception as e:
-        print(f"Błąd podczas pobierania statusu maszyny wirtualnej: {e}")
+        print(f"Błąd podczas pobierania statusu maszyny wirtualnej: {e}", file=out)
     
     # Uruchamianie maszyny wirtualnej
-    print("\n4. Uruchamianie maszyny wirtualnej:")
+    print("\n4. Uruchamianie maszyny wirtualnej:", file=out)
     try:
         api.vm.start_vm("example-vm")
-        print("Maszyna wirtualna została uruchomiona.")
+        print("Maszyna wirtualna została uruchomiona.", file=out)
     except Exception as e:
-        print(f"Błąd podczas uruchamiania maszyny wirtualnej: {e}")
+        print(f"Błąd podczas uruchamiania maszyny wirtualnej: {e}", file=out)
     
     # Zatrzymywanie maszyny wirtualnej
-    print("\n5. Zatrzymywanie maszyny wirtualnej:")
+    print("\n5. Zatrzymywanie maszyny wirtualnej:", file=out)
     try:
         api.vm.stop_vm("example-vm")
-        print("Maszyna wirtualna została zatrzymana.")
+        print("Maszyna wirtualna została zatrzymana.", file=out)
     except Exception as e:
-        print(f"Błąd podczas zatrzymywania maszyny wirtualnej: {e}")
+        print(f"Błąd podczas zatrzymywania maszyny wirtualnej: {e}", file=out)
     
     # Usuwanie maszyny wirtualnej
-    print("\n6. Usuwanie maszyny wirtualnej:")
+    print("\n6. Usuwanie maszyny wirtualnej:", file=out)
     try:
         api.vm.delete_vm("example-vm")
-        print("Maszyna wirtualna została usunięta.")
+        print("Maszyna wirtualna została usunięta.", file=out)
     except Exception as e:
-        print(f"Błąd podczas usuwania maszyny wirtualnej: {e}")
+        print(f"Błąd podczas usuwania maszyny wirtualnej: {e}", file=out)
 
 
-async def p2p_example():
+@buffered
+async def p2p_example(*, out):
     """Przykład zarządzania siecią P2P."""
-    print("\n=== Przykład zarządzania siecią P2P ===")
-    
-    # Uruchamianie usług P2P
-    print("\n1. Uruchamianie usług P2P:")
-    await api.p2p.start_services()
-    print("Usługi P2P zostały uruchomione.")
+    print("\n=== Przykład zarządzania siecią P2P ===", file=out)
     
     # Pobieranie informacji o lokalnym węźle
-    print("\n2. Pobieranie informacji o lokalnym węźle:")
+    print("\n1. Pobieranie informacji o lokalnym węźle:", file=out)
     local_info = api.p2p.get_local_peer_info()
-    print(json.dumps(local_info, indent=2))
+    show(local_info, out)
     
     # Listowanie węzłów w sieci
-    print("\n3. Listowanie węzłów w sieci:")
+    print("\n2. Listowanie węzłów w sieci:", file=out)
     peers = api.p2p.get_peers()
-    print(json.dumps(peers, indent=2))
+    show(peers, out)
     
     # Jeśli są dostępne węzły, wyślij wiadomość do pierwszego z nich
     if peers:
         peer_id = peers[0].get("id")
-        print(f"\n4. Wysyłanie wiadomości do węzła {peer_id}:")
+        print(f"\n3. Wysyłanie wiadomości do węzła {peer_id}:", file=out)
         try:
             response = await api.p2p.send_message(
                 peer_id=peer_id,
                 message_type="HELLO",
                 data={"message": "Hello from API example!"}
             )
-            print("Odpowiedź:")
-            print(json.dumps(response, indent=2))
+            print("Odpowiedź:", file=out)
+            show(response, out)
         except Exception as e:
-            print(f"Błąd podczas wysyłania wiadomości: {e}")
-    
-    # Zatrzymywanie usług P2P
-    print("\n5. Zatrzymywanie usług P2P:")
-    await api.p2p.stop_services()
-    print("Usługi P2P zostały zatrzymane.")
+            print(f"Błąd podczas wysyłania wiadomości: {e}", file=out)
 
 
-async def remote_vm_example():
+@buffered
+async def remote_vm_example(*, out):
     """Przykład zdalnego zarządzania maszynami wirtualnymi."""
-    print("\n=== Przykład zdalnego zarządzania maszynami wirtualnymi ===")
-    
-    # Uruchamianie usług P2P
-    await api.p2p.start_services()
+    print("\n=== Przykład zdalnego zarządzania maszynami wirtualnymi ===", file=out)
     
     # Listowanie węzłów w sieci
     peers = api.p2p.get_peers()
     
     if not peers:
-        print("Brak dostępnych węzłów w sieci.")
-        await api.p2p.stop_services()
+        print("Brak dostępnych węzłów w sieci.", file=out)
         return
     
     peer_id = peers[0].get("id")
-    print(f"Używanie węzła: {peer_id}")
-    
-    # Listowanie zdalnych maszyn wirtualnych
-    print("\n1. Listowanie zdalnych maszyn wirtualnych:")
-    try:
-        remote_vms = await api.vm.list_remote_vms(peer_id)
-        print(json.dumps(remote_vms, indent=2))
-    except Exception as e:
-        print(f"Błąd podczas listowania zdalnych maszyn wirtualnych: {e}")
+    print(f"Używanie węzła: {peer_id}", file=out)
     
-    # Tworzenie zdalnej maszyny wirtualnej
-    print("\n2. Tworzenie zdalnej maszyny wirtualnej:")
-    try:
-        response = await api.vm.create_remote_vm(
+    # Listowanie zdalnych maszyn i tworzenie nowej są od siebie niezależne,
+    # więc oba żądania wysyłamy współbieżnie
+    remote_vms, response = await asyncio.gather(
+        api.vm.list_remote_vms(peer_id),
+        api.vm.create_remote_vm(
             peer_id=peer_id,
             name="remote-example-vm",
             image="ubuntu-20.04",
             cpu_cores=2,
             memory=2048,
             disk_size=20
-        )
-        print(json.dumps(response, indent=2))
-        
-        # Pobierz ID utworzonej maszyny wirtualnej
-        vm_id = response.get("vm_id", "remote-example-vm")
-        
-        # Uruchamianie zdalnej maszyny wirtualnej
-        print("\n3. Uruchamianie zdalnej maszyny wirtualnej:")
-        response = await api.vm.start_remote_vm(peer_id, vm_id)
-        print(json.dumps(response, indent=2))
-        
-        # Zatrzymywanie zdalnej maszyny wirtualnej
-        print("\n4. Zatrzymywanie zdalnej maszyny wirtualnej:")
-        response = await api.vm.stop_remote_vm(peer_id, vm_id)
-        print(json.dumps(response, indent=2))
-        
-        # Usuwanie zdalnej maszyny wirtualnej
-        print("\n5. Usuwanie zdalnej maszyny wirtualnej:")
-        response = await api.vm.delete_remote_vm(peer_id, vm_id)
-        print(json.dumps(response, indent=2))
-        
-    except Exception as e:
-        print(f"Błąd podczas operacji na zdalnej maszynie wirtualnej: {e}")
+        ),
+        return_exceptions=True
+    )
+    
+    # Listowanie zdalnych maszyn wirtualnych
+    print("\n1. Listowanie zdalnych maszyn wirtualnych:", file=out)
+    if isinstance(remote_vms, Exception):
+        print(f"Błąd podczas listowania zdalnych maszyn wirtualnych: {remote_vms}", file=out)
+    else:
+        show(remote_vms, out)
     
-    # Zatrzymywanie usług P2P
-    await api.p2p.stop_services()
+    # Tworzenie zdalnej maszyny wirtualnej
+    print("\n2. Tworzenie zdalnej maszyny wirtualnej:", file=out)
+    if isinstance(response, Exception):
+        print(f"Błąd podczas operacji na zdalnej maszynie wirtualnej: {response}", file=out)
+    else:
+        show(response, out)
+        
+        try:
+            # Pobierz ID utworzonej maszyny wirtualnej
+            vm_id = response.get("vm_id", "remote-example-vm")
+            
+            # Uruchamianie zdalnej maszyny wirtualnej
+            print("\n3. Uruchamianie zdalnej maszyny wirtualnej:", file=out)
+            response = await api.vm.start_remote_vm(peer_id, vm_id)
+            show(response, out)
+            
+            # Zatrzymywanie zdalnej maszyny wirtualnej
+            print("\n4. Zatrzymywanie zdalnej maszyny wirtualnej:", file=out)
+            response = await api.vm.stop_remote_vm(peer_id, vm_id)
+            show(response, out)
+            
+            # Usuwanie zdalnej maszyny wirtualnej
+            print("\n5. Usuwanie zdalnej maszyny wirtualnej:", file=out)
+            response = await api.vm.delete_remote_vm(peer_id, vm_id)
+            show(response, out)
+            
+        except Exception as e:
+            print(f"Błąd podczas operacji na zdalnej maszynie wirtualnej: {e}", file=out)
 
 
 async def main():
@@ -180,12 +214,26 @@ async def main():
     # Przykład zarządzania maszynami wirtualnymi
     await vm_management_example()
     
-    # Przykład zarządzania siecią P2P
-    await p2p_example()
-    
-    # Przykład zdalnego zarządzania maszynami wirtualnymi
-    await remote_vm_example()
+    # Usługi P2P są uruchamiane raz dla obu przykładów sieciowych
+    print("Uruchamianie usług P2P...")
+    await api.p2p.start_services()
+    try:
+        # Przykład zarządzania siecią P2P
+        await p2p_example()
+        
+        # Przykład zdalnego zarządzania maszynami wirtualnymi
+        await remote_vm_example()
+    finally:
+        print("\nZatrzymywanie usług P2P...")
+        await api.p2p.stop_services()
 
 
 if __name__ == "__main__":
+    # Szybsza pętla zdarzeń uvloop, jeśli jest zainstalowana
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     asyncio.run(main())
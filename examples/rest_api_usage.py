@@ -5,6 +5,8 @@ Przykład użycia REST API twinshare do zarządzania maszynami wirtualnymi i sie
 """
 
 import asyncio
+import functools
+import io
 import json
 import sys
 from pathlib import Path
@@ -15,185 +17,238 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from src.api.rest_client import RESTClient
 
 
-async def vm_management_example(client):
+try:
+    import orjson
+
+    def jdump(obj):
+        """Zwraca obiekt sformatowany jako czytelny JSON."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def jdump(obj):
+        """Zwraca obiekt sformatowany jako czytelny JSON."""
+        return json.dumps(obj, indent=2)
+
+
+def show(obj, out):
+    """Wypisuje obiekt jako czytelny JSON."""
+    print(jdump(obj), file=out)
+
+
+def buffered(fn):
+    """
+    Zbiera wyjście przykładu w buforze i wypisuje je jednym zapisem.
+
+    Przykłady wykonywane współbieżnie nie przeplatają wtedy swojego wyjścia.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        out = io.StringIO()
+        try:
+            return await fn(*args, out=out, **kwargs)
+        finally:
+            sys.stdout.write(out.getvalue())
+
+    return wrapper
+
+
+@buffered
+async def vm_management_example(client, *, out):
     """Przykład zarządzania maszynami wirtualnymi przez REST API."""
-    print("=== Przykład zarządzania maszynami wirtualnymi przez REST API ===")
+    print("=== Przykład zarządzania maszynami wirtualnymi przez REST API ===", file=out)
     
-    # Listowanie maszyn wirtualnych
-    print("\n1. Listowanie maszyn wirtualnych:")
-    try:
-        vms = await client.list_vms()
-        print(json.dumps(vms, indent=2))
-    except Exception as e:
-        print(f"Błąd podczas listowania maszyn wirtualnych: {e}")
-    
-    # Tworzenie maszyny wirtualnej
-    print("\n2. Tworzenie maszyny wirtualnej:")
-    try:
-        vm = await client.create_vm(
+    # Listowanie istniejących maszyn i tworzenie nowej są od siebie niezależne,
+    # więc oba żądania wysyłamy współbieżnie
+    vms, vm = await asyncio.gather(
+        client.list_vms(),
+        client.create_vm(
             name="rest-example-vm",
             image="ubuntu-20.04",
             cpu_cores=2,
             memory=2048,
             disk_size=20
-        )
-        print(json.dumps(vm, indent=2))
-    except Exception as e:
-        print(f"Błąd podczas tworzenia maszyny wirtualnej: {e}")
+        ),
+        return_exceptions=True
+    )
+    
+    # Listowanie maszyn wirtualnych
+    print("\n1. Listowanie maszyn wirtualnych:", file=out)
+    if isinstance(vms, Exception):
+        print(f"Błąd podczas listowania maszyn wirtualnych: {vms}", file=out)
+    else:
+        show(vms, out)
+    
+    # Tworzenie maszyny wirtualnej
+    print("\n2. Tworzenie maszyny wirtualnej:", file=out)
+    if isinstance(vm, Exception):
+        print(f"Błąd podczas tworzenia maszyny wirtualnej: {vm}", file=out)
+    else:
+        show(vm, out)
     
     # Pobieranie statusu maszyny wirtualnej
-    print("\n3. Pobieranie statusu maszyny wirtualnej:")
+    print("\n3. Pobieranie statusu maszyny wirtualnej:", file=out)
     try:
         status = await client.get_vm_status("rest-example-vm")
-        print(json.dumps(status, indent=2))
+        show(status, out)
     except Exception as e:
-        print(f"Błąd podczas pobierania statusu maszyny wirtualnej: {e}")
+        print(f"Błąd podczas pobierania statusu maszyny wirtualnej: {e}", file=out)
     
     # Uruchamianie maszyny wirtualnej
-    print("\n4. Uruchamianie maszyny wirtualnej:")
+    print("\n4. Uruchamianie maszyny wirtualnej:", file=out)
     try:
         result = await client.start_vm("rest-example-vm")
-        print(json.dumps(result, indent=2))
+        show(result, out)
     except Exception as e:
-        print(f"Błąd podczas uruchamiania maszyny wirtualnej: {e}")
+        print(f"Błąd podczas uruchamiania maszyny wirtualnej: {e}", file=out)
     
     # Zatrzymywanie maszyny wirtualnej
-    print("\n5. Zatrzymywanie maszyny wirtualnej:")
+    print("\n5. Zatrzymywanie maszyny wirtualnej:", file=out)
     try:
         result = await client.stop_vm("rest-example-vm")
-        print(json.dumps(result, indent=2))
+        show(result, out)
     except Exception as e:
-        print(f"Błąd podczas zatrzymywania maszyny wirtualnej: {e}")
+        print(f"Błąd podczas zatrzymywania maszyny wirtualnej: {e}", file=out)
     
     # Usuwanie maszyny wirtualnej
-    print("\n6. Usuwanie maszyny wirtualnej:")
+    print("\n6. Usuwanie maszyny wirtualnej:", file=out)
     try:
         result = await client.delete_vm("rest-example-vm")
-        print(json.dumps(result, indent=2))
+        show(result, out)
     except Exception as e:
-        print(f"Błąd podczas usuwania maszyny wirtualnej: {e}")
+        print(f"Błąd podczas usuwania maszyny wirtualnej: {e}", file=out)
 
 
-async def p2p_example(client):
+@buffered
+async def p2p_example(client, *, out):
     """Przykład zarządzania siecią P2P przez REST API."""
-    print("\n=== Przykład zarządzania siecią P2P przez REST API ===")
+    print("\n=== Przykład zarządzania siecią P2P przez REST API ===", file=out)
     
     # Uruchamianie usług P2P
-    print("\n1. Uruchamianie usług P2P:")
+    print("\n1. Uruchamianie usług P2P:", file=out)
     try:
         result = await client.start_p2p_services()
-        print(json.dumps(result, indent=2))
+        show(result, out)
     except Exception as e:
-        print(f"Błąd podczas uruchamiania usług P2P: {e}")
+        print(f"Błąd podczas uruchamiania usług P2P: {e}", file=out)
     
     # Pobieranie informacji o lokalnym węźle
-    print("\n2. Pobieranie informacji o lokalnym węźle:")
+    print("\n2. Pobieranie informacji o lokalnym węźle:", file=out)
     try:
         info = await client.get_local_peer_info()
-        print(json.dumps(info, indent=2))
+        show(info, out)
     except Exception as e:
-        print(f"Błąd podczas pobierania informacji o lokalnym węźle: {e}")
+        print(f"Błąd podczas pobierania informacji o lokalnym węźle: {e}", file=out)
     
     # Listowanie węzłów w sieci
-    print("\n3. Listowanie węzłów w sieci:")
+    print("\n3. Listowanie węzłów w sieci:", file=out)
     try:
         peers = await client.get_peers()
-        print(json.dumps(peers, indent=2))
+        show(peers, out)
     except Exception as e:
-        print(f"Błąd podczas listowania węzłów w sieci: {e}")
+        print(f"Błąd podczas listowania węzłów w sieci: {e}", file=out)
     
     # Jeśli są dostępne węzły, wyślij wiadomość do pierwszego z nich
     if peers:
         peer_id = peers[0].get("id")
-        print(f"\n4. Wysyłanie wiadomości do węzła {peer_id}:")
+        print(f"\n4. Wysyłanie wiadomości do węzła {peer_id}:", file=out)
         try:
             response = await client.send_message(
                 peer_id=peer_id,
                 message_type="HELLO",
                 data={"message": "Hello from REST API example!"}
             )
-            print(json.dumps(response, indent=2))
+            show(response, out)
         except Exception as e:
-            print(f"Błąd podczas wysyłania wiadomości: {e}")
+            print(f"Błąd podczas wysyłania wiadomości: {e}", file=out)
     
     # Zatrzymywanie usług P2P
-    print("\n5. Zatrzymywanie usług P2P:")
+    print("\n5. Zatrzymywanie usług P2P:", file=out)
     try:
         result = await client.stop_p2p_services()
-        print(json.dumps(result, indent=2))
+        show(result, out)
     except Exception as e:
-        print(f"Błąd podczas zatrzymywania usług P2P: {e}")
+        print(f"Błąd podczas zatrzymywania usług P2P: {e}", file=out)
 
 
-async def remote_vm_example(client):
+@buffered
+async def remote_vm_example(client, *, out):
     """Przykład zdalnego zarządzania maszynami wirtualnymi przez REST API."""
-    print("\n=== Przykład zdalnego zarządzania maszynami wirtualnymi przez REST API ===")
+    print("\n=== Przykład zdalnego zarządzania maszynami wirtualnymi przez REST API ===", file=out)
     
     # Uruchamianie usług P2P
     try:
         await client.start_p2p_services()
     except Exception as e:
-        print(f"Błąd podczas uruchamiania usług P2P: {e}")
+        print(f"Błąd podczas uruchamiania usług P2P: {e}", file=out)
         return
     
     # Listowanie węzłów w sieci
     peers = await client.get_peers()
     
     if not peers:
-        print("Brak dostępnych węzłów w sieci.")
+        print("Brak dostępnych węzłów w sieci.", file=out)
         await client.stop_p2p_services()
         return
     
     peer_id = peers[0].get("id")
-    print(f"Używanie węzła: {peer_id}")
+    print(f"Używanie węzła: {peer_id}", file=out)
     
-    # Listowanie zdalnych maszyn wirtualnych
-    print("\n1. Listowanie zdalnych maszyn wirtualnych:")
-    try:
-        remote_vms = await client.list_remote_vms(peer_id)
-        print(json.dumps(remote_vms, indent=2))
-    except Exception as e:
-        print(f"Błąd podczas listowania zdalnych maszyn wirtualnych: {e}")
-    
-    # Tworzenie zdalnej maszyny wirtualnej
-    print("\n2. Tworzenie zdalnej maszyny wirtualnej:")
-    try:
-        response = await client.create_remote_vm(
+    # Listowanie zdalnych maszyn i tworzenie nowej są od siebie niezależne,
+    # więc oba żądania wysyłamy współbieżnie
+    remote_vms, response = await asyncio.gather(
+        client.list_remote_vms(peer_id),
+        client.create_remote_vm(
             peer_id=peer_id,
             name="remote-rest-example-vm",
             image="ubuntu-20.04",
             cpu_cores=2,
             memory=2048,
             disk_size=20
-        )
-        print(json.dumps(response, indent=2))
-        
-        # Pobierz ID utworzonej maszyny wirtualnej
-        vm_id = response.get("vm_id", "remote-rest-example-vm")
-        
-        # Uruchamianie zdalnej maszyny wirtualnej
-        print("\n3. Uruchamianie zdalnej maszyny wirtualnej:")
-        response = await client.start_remote_vm(peer_id, vm_id)
-        print(json.dumps(response, indent=2))
-        
-        # Zatrzymywanie zdalnej maszyny wirtualnej
-        print("\n4. Zatrzymywanie zdalnej maszyny wirtualnej:")
-        response = await client.stop_remote_vm(peer_id, vm_id)
-        print(json.dumps(response, indent=2))
-        
-        # Usuwanie zdalnej maszyny wirtualnej
-        print("\n5. Usuwanie zdalnej maszyny wirtualnej:")
-        response = await client.delete_remote_vm(peer_id, vm_id)
-        print(json.dumps(response, indent=2))
+        ),
+        return_exceptions=True
+    )
+    
+    # Listowanie zdalnych maszyn wirtualnych
+    print("\n1. Listowanie zdalnych maszyn wirtualnych:", file=out)
+    if isinstance(remote_vms, Exception):
+        print(f"Błąd podczas listowania zdalnych maszyn wirtualnych: {remote_vms}", file=out)
+    else:
+        show(remote_vms, out)
+    
+    # Tworzenie zdalnej maszyny wirtualnej
+    print("\n2. Tworzenie zdalnej maszyny wirtualnej:", file=out)
+    if isinstance(response, Exception):
+        print(f"Błąd podczas operacji na zdalnej maszynie wirtualnej: {response}", file=out)
+    else:
+        show(response, out)
         
-    except Exception as e:
-        print(f"Błąd podczas operacji na zdalnej maszynie wirtualnej: {e}")
+        try:
+            # Pobierz ID utworzonej maszyny wirtualnej
+            vm_id = response.get("vm_id", "remote-rest-example-vm")
+            
+            # Uruchamianie zdalnej maszyny wirtualnej
+            print("\n3. Uruchamianie zdalnej maszyny wirtualnej:", file=out)
+            response = await client.start_remote_vm(peer_id, vm_id)
+            show(response, out)
+            
+            # Zatrzymywanie zdalnej maszyny wirtualnej
+            print("\n4. Zatrzymywanie zdalnej maszyny wirtualnej:", file=out)
+            response = await client.stop_remote_vm(peer_id, vm_id)
+            show(response, out)
+            
+            # Usuwanie zdalnej maszyny wirtualnej
+            print("\n5. Usuwanie zdalnej maszyny wirtualnej:", file=out)
+            response = await client.delete_remote_vm(peer_id, vm_id)
+            show(response, out)
+            
+        except Exception as e:
+            print(f"Błąd podczas operacji na zdalnej maszynie wirtualnej: {e}", file=out)
     
     # Zatrzymywanie usług P2P
     try:
         await client.stop_p2p_services()
     except Exception as e:
-        print(f"Błąd podczas zatrzymywania usług P2P: {e}")
+        print(f"Błąd podczas zatrzymywania usług P2P: {e}", file=out)
 
 
 async def main():
@@ -203,15 +258,23 @@ async def main():
     
     # Utwórz klienta REST API
     async with RESTClient("http://localhost:8080") as client:
-        # Przykład zarządzania maszynami wirtualnymi
-        await vm_management_example(client)
-        
-        # Przykład zarządzania siecią P2P
-        await p2p_example(client)
+        # Przykłady zarządzania maszynami wirtualnymi i siecią P2P są niezależne,
+        # więc wykonujemy je współbieżnie na wspólnej puli połączeń
+        await asyncio.gather(
+            vm_management_example(client),
+            p2p_example(client)
+        )
         
         # Przykład zdalnego zarządzania maszynami wirtualnymi
         await remote_vm_example(client)
 
 
 if __name__ == "__main__":
+    # Szybsza pętla zdarzeń uvloop, jeśli jest zainstalowana
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     asyncio.run(main())
@@ -80,7 +80,7 @@ pip install -e .
 
 # Explicitly install all required dependencies
 print_message "Installing required dependencies..."
-pip install pyyaml aiohttp asyncio tabulate cryptography python-daemon netifaces zeroconf
+pip install pyyaml aiohttp tabulate cryptography python-daemon netifaces zeroconf
 
 # Create the bin directory in the user's home if it doesn't exist
 USER_BIN_DIR="${HOME}/.local/bin"
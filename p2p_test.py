@@ -6,27 +6,48 @@ This script tests the basic P2P discovery and networking functionality.
 
 import asyncio
 import argparse
+import atexit
+import functools
+import heapq
+import ipaddress
 import logging
+import logging.handlers
+import queue
+import random
+import signal
 import sys
+import secrets
 import time
-import uuid
 import socket
 import json
 import os
-from zeroconf import ServiceInfo, Zeroconf, ServiceBrowser
+import struct
+from zeroconf import ServiceInfo, ServiceStateChange
+from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo, AsyncZeroconf
 
 # Create logs directory if it doesn't exist
 os.makedirs('logs', exist_ok=True)
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('logs/p2p_test.log')
-    ]
+# Records are queued and written by a background listener thread, and file
+# output is flushed in blocks instead of once per record
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(log_formatter)
+file_handler = logging.FileHandler('logs/p2p_test.log', delay=True)
+file_handler.setFormatter(log_formatter)
+buffered_file_handler = logging.handlers.MemoryHandler(
+    capacity=512, flushLevel=logging.ERROR, target=file_handler
 )
+
+log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(log_queue, stream_handler, buffered_file_handler)
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logger = logging.getLogger("p2p_test")
 
 # Try to import optional dependencies
@@ -37,58 +58,381 @@ except ImportError:
     logger.warning("Optional dependencies (netifaces) not available. Some features will be limited.")
     HAVE_DEPENDENCIES = False
 
+# Faster JSON parsing when orjson is installed
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+@functools.lru_cache(maxsize=4)
+def _parse_config(path, mtime_ns, size):
+    """Parse a JSON configuration file; reused until the file is modified.
+    
+    The size is part of the cache key as well, so a rewrite within the
+    timestamp resolution of the file system is still noticed.
+    """
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+# Framed heartbeat exchanged over persistent peer connections
+PING_PAYLOAD = b'PING'
+PING_FRAME = struct.pack('!I', len(PING_PAYLOAD)) + PING_PAYLOAD
+PING_ACK = b'\x01'
+MAX_FRAME_SIZE = 1024
+
+# Each peer is probed every PING_INTERVAL seconds plus a random jitter so
+# that probes of different peers do not all fire on the same tick
+PING_INTERVAL = 30
+PING_JITTER = 5
+
+def _new_peer(name, ip, port):
+    """Create the record kept for a peer in P2PNode.peers."""
+    return {
+        'name': name,
+        'ip': ip,
+        'port': port,
+        'last_seen': time.time(),
+        'last_check': 0.0,
+        'next_check': 0.0,  # time.monotonic() of the next probe, 0 means now
+        'healthy': False
+    }
+
+def _peer_id(ip, port):
+    """Return the interned id of the peer at ip:port.
+    
+    Every discovery path (Zeroconf, beacons, subnet scan, known servers)
+    keys peers this way, so a node found by several of them is tracked once.
+    """
+    return sys.intern(f"{ip}:{port}")
+
+# The node's own /24 is scanned for peers when mDNS does not work; a scan
+# that found peers is reused for SCAN_CACHE_TTL seconds
+SCAN_CONCURRENCY = 32
+SCAN_TIMEOUT = 0.5
+SCAN_CACHE_TTL = 300
+
+# Peer added when the scan finds nothing: the fixed host number of the other
+# container in the Docker test setup (.2 server, .3 client), by node type
+DOCKER_FALLBACK_PEERS = {
+    'server': ('twinshare-client', 3),
+    'client': ('twinshare-server', 2),
+}
+
+def _private_prefix(ip):
+    """Return the 'a.b.c.' prefix of the /24 holding ip if it is a private address."""
+    try:
+        address = ipaddress.IPv4Address(ip)
+    except ValueError:
+        return None
+    if (not address.is_private or address.is_loopback or address.is_link_local
+            or address.is_unspecified):
+        return None
+    return ip.rsplit('.', 1)[0] + '.'
+
+# TXT record keys of the _twinshare service
+_K_NAME = b'name'
+_K_NODE_ID = b'node_id'
+_K_NETWORK_PORT = b'network_port'
+_K_ROLE = b'role'
+_K_TYPE = b'type'
+_TYPE_BYTES = {'server': b'server', 'client': b'client'}
+
+# Servers additionally register under a well-known rendezvous name, so a
+# client finds its server with a single mDNS query
+SERVICE_TYPE = "_twinshare._udp.local."
+RENDEZVOUS_TYPE = "_twinshare-rendezvous._udp.local."
+RENDEZVOUS_NAME = f"twinshare-server.{RENDEZVOUS_TYPE}"
+
+# At most this many discovered services are resolved at the same time
+RESOLVE_CONCURRENCY = 8
+
+# Peers are re-discovered every REDISCOVER_INTERVAL seconds; the mDNS records
+# use the same TTL so cached copies on other nodes expire in step with it
+REDISCOVER_INTERVAL = 30
+
+# Peer connections unused for longer than this are closed
+PEER_CONN_IDLE_TIMEOUT = 60
+
+def _tune_peer_socket(sock):
+    """Disable Nagle and enable fast keepalive probing on a peer connection."""
+    if sock is None:
+        return
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Linux only: declare a silent peer dead after about 25 seconds
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 10)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 5)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+# Peer data persisted between runs
+PEER_CACHE_FILE = 'logs/peer_cache.json'
+
+# Cached peers not seen for longer than this are not restored
+PEER_CACHE_MAX_AGE = 86400
+
+# Node ids are kept between runs, one file per node type, so the Zeroconf
+# instance name stays the same and peers can reuse their cached records
+NODE_ID_FILE = 'logs/node-{}.id'
+
+
+def _valid_node_id(node_id):
+    """Return True if node_id is 16 hex digits, the form packed into beacons."""
+    try:
+        return len(bytes.fromhex(node_id)) == 8 and len(node_id) == 16
+    except ValueError:
+        return False
+
+def _load_node_id(node_type):
+    """Return the persisted node id for node_type, creating it on first run.
+    
+    A missing or malformed id file is replaced with a new id.
+    """
+    path = NODE_ID_FILE.format(node_type)
+    try:
+        with open(path) as f:
+            node_id = f.read().strip()
+        if _valid_node_id(node_id):
+            return node_id
+        logger.warning("Invalid node id in %s, generating a new one", path)
+    except FileNotFoundError:
+        pass
+    node_id = secrets.token_hex(8)
+    with open(path, 'w') as f:
+        f.write(node_id)
+    return node_id
+
+# Host name of this machine, the same for every node in the process
+_HOSTNAME = socket.gethostname()
+
+# Packed IPv4 addresses for ServiceInfo: ip -> 4 bytes
+_PACKED_IP = {}
+
+def _packed_ip(ip):
+    """Return the packed form of an IPv4 address, reusing earlier results."""
+    packed = _PACKED_IP.get(ip)
+    if packed is None:
+        packed = _PACKED_IP[ip] = socket.inet_aton(ip)
+    return packed
+
+# Resolved hostnames: host -> (ip, resolved_at)
+DNS_CACHE_TTL = 300
+_DNS_CACHE = {}
+
+# Failed lookups: host -> (error, failed_at). Kept longer than one
+# re-discovery interval so a dead name is not retried on every round
+DNS_NEGATIVE_TTL = 60
+_DNS_FAILURES = {}
+
+async def _resolve(host):
+    """Resolve a hostname to an IPv4 address, reusing recent results."""
+    now = time.time()
+    cached = _DNS_CACHE.get(host)
+    if cached and now - cached[1] < DNS_CACHE_TTL:
+        return cached[0]
+    
+    failed = _DNS_FAILURES.get(host)
+    if failed and now - failed[1] < DNS_NEGATIVE_TTL:
+        raise failed[0]
+    
+    # Resolve in the loop's executor so a slow DNS server does not block it
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, None, family=socket.AF_INET, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        _DNS_FAILURES[host] = (e, now)
+        raise
+    ip = infos[0][4][0]
+    _DNS_CACHE[host] = (ip, now)
+    _DNS_FAILURES.pop(host, None)
+    return ip
+
+# How long a detected local IP address is reused before it is looked up again
+IP_CACHE_TTL = 60
+
+def _primary_ip():
+    """Return the address of the interface used for outbound traffic, or None."""
+    # With netifaces the interface of the default route is known without
+    # touching a socket
+    if HAVE_DEPENDENCIES:
+        try:
+            interface = netifaces.gateways()['default'][netifaces.AF_INET][1]
+            return netifaces.ifaddresses(interface)[netifaces.AF_INET][0]['addr']
+        except (KeyError, IndexError, ValueError):
+            pass
+    
+    # Connecting a UDP socket only selects a route, no packets are sent
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+# UDP beacon broadcast on the discovery port every BEACON_INTERVAL seconds:
+# magic, node id (8 bytes), node type and network port. The limited broadcast
+# address is given explicitly, not as the '<broadcast>' alias, which not
+# every event loop implementation accepts
+BEACON = struct.Struct('!4s8sBH')
+BEACON_MAGIC = b'TWSB'
+BEACON_ADDRESS = '255.255.255.255'
+BEACON_INTERVAL = 1
+_NODE_TYPES = ('server', 'client')
+
+class _BeaconProtocol(asyncio.DatagramProtocol):
+    """Pass beacons received on the discovery port to the node."""
+    
+    def __init__(self, node):
+        self.node = node
+    
+    def datagram_received(self, data, addr):
+        self.node._on_beacon(data, addr[0])
+    
+    def error_received(self, exc):
+        logger.debug("Beacon socket error: %s", exc)
+
 class P2PNode:
-    def __init__(self, node_type="server", config_file=None):
-        """Initialize a P2P node."""
-        # Generate a unique node ID
-        self.node_id = str(uuid.uuid4())
+    # Zeroconf instance shared by every node in the process; created lazily on
+    # the first start_discovery() and closed by close_zeroconf() on shutdown
+    _zc = None
+
+    @classmethod
+    def _get_zeroconf(cls):
+        """Return the process-wide AsyncZeroconf instance, creating it on first use."""
+        if cls._zc is None:
+            cls._zc = AsyncZeroconf()
+        return cls._zc
+
+    @classmethod
+    async def close_zeroconf(cls):
+        """Close the shared Zeroconf instance, if it was created."""
+        if cls._zc is not None:
+            zc, cls._zc = cls._zc, None
+            await zc.async_close()
+
+    def __init__(self, node_type="server", config_file=None, zeroconf=None):
+        """Initialize a P2P node.
+        
+        An AsyncZeroconf instance owned by the caller can be passed in as
+        zeroconf; otherwise the node uses the shared one from _get_zeroconf().
+        The node only unregisters its own services and never closes it.
+        """
         self.node_type = node_type
         self.name = f"twinshare-{node_type}"
+        self.hostname = _HOSTNAME
         
-        # Set up logging
-        self.setup_logging()
+        # Servers to connect to besides the discovered ones
+        self.known_servers = []
         
         # Load configuration
         self.load_config(config_file)
         
+        # Node ID, stable across restarts of the same node type
+        self.node_id = _load_node_id(self.node_type)
+        
+        # Set up logging
+        self.setup_logging()
+        
         # Initialize discovery service
-        self.zeroconf = None
+        self.zeroconf = zeroconf
         self.browser = None
         self.info = None
+        self.rendezvous_info = None
+        self._registered = False
+        self._zc_tasks = set()
+        self._resolve_slots = None
         self.running = False
         
         # Initialize peers
         self.peers = {}
         
+        # Probe schedule: heap of (next_check, peer_id); entries whose time no
+        # longer matches the peer's next_check are stale and skipped
+        self._ping_heap = []
+        
+        # Persistent connections to peers: peer_id -> (reader, writer)
+        self._peer_conns = {}
+        
+        # Time until which the last subnet scan is trusted
+        self._scan_expiry = 0.0
+        
+        # Restore cached data from the previous run
+        self.load_peer_cache()
+        
         # Get IP address
+        self._cached_ip = None
+        self._ip_expiry = 0.0
         self.ip_address = self.get_ip_address()
         
+        # Service records are built once and reused by every registration
+        self._build_service_infos()
+        
+        # Beacon announcing this node, sent by send_beacon(); nodes of a type
+        # the beacon format does not know only listen
+        self._beacon_transport = None
+        self._beacon = None
+        if self.node_type in _NODE_TYPES and _valid_node_id(self.node_id):
+            self._beacon = BEACON.pack(
+                BEACON_MAGIC, bytes.fromhex(self.node_id),
+                _NODE_TYPES.index(self.node_type), self.network_port
+            )
+        
         # Log initialization
-        logger.info(f"Node initialized: {self.node_id} ({self.name}, {self.ip_address})")
-        logger.info(f"Discovery port: {self.discovery_port}, Network port: {self.network_port}")
+        logger.info("Node initialized: %s (%s, %s, %s)", self.node_id, self.name, self.hostname, self.ip_address)
+        logger.info("Discovery port: %s, Network port: %s", self.discovery_port, self.network_port)
+    
+    def _build_service_infos(self):
+        """Build the Zeroconf service records with pre-encoded properties."""
+        address = _packed_ip(self.ip_address)
+        name = self.name.encode()
+        node_id = self.node_id.encode()
+        network_port = b'%d' % self.network_port
+        self.info = ServiceInfo(
+            SERVICE_TYPE,
+            f"{self.node_id}.{SERVICE_TYPE}",
+            addresses=[address],
+            port=self.discovery_port,  # Use discovery_port (UDP) for service registration
+            properties={
+                _K_NAME: name,
+                _K_NODE_ID: node_id,
+                _K_TYPE: _TYPE_BYTES.get(self.node_type) or self.node_type.encode(),
+                _K_NETWORK_PORT: network_port  # Include network_port in properties
+            },
+            server=f"{self.name}.local."
+        )
+        if self.node_type == "server":
+            self.rendezvous_info = ServiceInfo(
+                RENDEZVOUS_TYPE,
+                RENDEZVOUS_NAME,
+                addresses=[address],
+                port=self.network_port,
+                properties={
+                    _K_ROLE: b'server',
+                    _K_NAME: name,
+                    _K_NODE_ID: node_id,
+                    _K_NETWORK_PORT: network_port
+                },
+                server=f"{self.name}.local."
+            )
     
     def setup_logging(self):
         """Set up logging for the node."""
-        # Create a logger for the node
+        # Node records propagate to the root logger and are written by the
+        # shared queue listener, so no per-node log file is opened
         self.logger = logging.getLogger(f"p2p_node_{self.node_id}")
         self.logger.setLevel(logging.INFO)
-        
-        # Create a file handler for the node
-        file_handler = logging.FileHandler(f"logs/p2p_node_{self.node_id}.log")
-        file_handler.setLevel(logging.INFO)
-        
-        # Create a formatter and add it to the file handler
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        
-        # Add the file handler to the logger
-        self.logger.addHandler(file_handler)
     
     def load_config(self, config_file):
         """Load configuration from a JSON file."""
         try:
-            with open(config_file, 'r') as f:
-                config = json.load(f)
+            st = os.stat(config_file)
+            config = _parse_config(config_file, st.st_mtime_ns, st.st_size)
             
             # Update node configuration
             if 'node_type' in config:
@@ -98,14 +442,92 @@ class P2PNode:
             if 'network_port' in config:
                 self.network_port = config['network_port']
             if 'known_servers' in config:
-                self.known_servers = config['known_servers']
+                self.known_servers = list(config['known_servers'])
             
-            logger.info(f"Loaded configuration from {config_file}")
+            logger.info("Loaded configuration from %s", config_file)
         except Exception as e:
-            logger.error(f"Error loading configuration: {e}")
+            logger.error("Error loading configuration: %s", e)
+    
+    def load_peer_cache(self):
+        """Load data cached by a previous run from the peer cache file."""
+        try:
+            with open(PEER_CACHE_FILE, 'rb') as f:
+                cache = _loads(f.read())
+            
+            for host, (ip, resolved_at) in cache.get('dns', {}).items():
+                _DNS_CACHE.setdefault(host, (ip, resolved_at))
+            
+            # Restore recently seen peers; they are probed again from scratch
+            oldest = time.time() - PEER_CACHE_MAX_AGE
+            for cached in cache.get('peers', {}).values():
+                peer_id = _peer_id(cached['ip'], cached['port'])
+                if cached['last_seen'] > oldest and peer_id not in self.peers:
+                    peer = _new_peer(cached['name'], cached['ip'], cached['port'])
+                    peer['last_seen'] = cached['last_seen']
+                    self._insert_peer(peer_id, peer)
+            
+            logger.info("Loaded peer cache from %s", PEER_CACHE_FILE)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Error loading peer cache: %s", e)
+    
+    def save_peer_cache(self):
+        """Save data worth keeping across restarts to the peer cache file."""
+        try:
+            with open(PEER_CACHE_FILE, 'wb') as f:
+                f.write(_dumps({
+                    'dns': _DNS_CACHE,
+                    'peers': {
+                        peer_id: {
+                            'name': peer['name'],
+                            'ip': peer['ip'],
+                            'port': peer['port'],
+                            'last_seen': peer['last_seen']
+                        }
+                        for peer_id, peer in self.peers.items()
+                    }
+                }))
+        except Exception as e:
+            logger.error("Error saving peer cache: %s", e)
     
     def get_ip_address(self):
-        """Get the IP address of the current machine."""
+        """Get the IP address of the current machine, cached for IP_CACHE_TTL seconds."""
+        now = time.monotonic()
+        if self._cached_ip is not None and now < self._ip_expiry:
+            return self._cached_ip
+        
+        if os.environ.get("TWINSHARE_USE_NETIFACES"):
+            ip = self._get_interface_ip_address()
+        else:
+            ip = _primary_ip()
+            if ip is None:
+                # No route out of the host, look at the interfaces instead
+                ip = self._get_interface_ip_address()
+        
+        self._cached_ip = ip
+        self._ip_expiry = now + IP_CACHE_TTL
+        return ip
+    
+    def refresh_ip(self):
+        """Look up the IP address again, e.g. after a network change.
+        
+        Returns:
+            True if the address changed. The service records are rebuilt
+            then, and the next start_discovery() announces the new address.
+        """
+        self._cached_ip = None
+        ip = self.get_ip_address()
+        if ip == self.ip_address:
+            return False
+        
+        logger.info("IP address changed: %s -> %s", self.ip_address, ip)
+        self.ip_address = ip
+        self._build_service_infos()
+        return True
+    
+    def _get_interface_ip_address(self):
+        """Get the first non-loopback IPv4 address by scanning network interfaces."""
         if not HAVE_DEPENDENCIES:
             return "127.0.0.1"  # Fallback when netifaces is not available
             
@@ -123,114 +545,249 @@ class P2PNode:
             # Fallback to localhost if no other IP is found
             return '127.0.0.1'
         except Exception as e:
-            logger.error(f"Error getting IP address: {e}")
+            logger.error("Error getting IP address: %s", e)
             return '127.0.0.1'
     
-    def start_discovery(self):
+    async def start_discovery(self):
         """Start the P2P discovery service."""
         if not HAVE_DEPENDENCIES:
             logger.warning("Discovery service not available without zeroconf dependency")
             return False
         
+        await self._start_beacons()
+        
+        # Reconnect to peers remembered from the previous run while Zeroconf
+        # and the other discovery methods start up
+        verify_cached = asyncio.gather(
+            *(self._verify_peer_connectivity(peer_id) for peer_id in list(self.peers))
+        )
+        
         try:
-            # Create a zeroconf instance
-            self.zeroconf = Zeroconf()
-            
-            # Register the service
-            self.info = ServiceInfo(
-                "_twinshare._udp.local.",
-                f"{self.node_id}._twinshare._udp.local.",
-                addresses=[socket.inet_aton(self.ip_address)],
-                port=self.discovery_port,  # Use discovery_port (UDP) for service registration
-                properties={
-                    'name': self.name,
-                    'node_id': self.node_id,
-                    'type': self.node_type,
-                    'network_port': str(self.network_port)  # Include network_port in properties
-                },
-                server=f"{self.name}.local."
-            )
+            # Reuse the injected or the shared zeroconf instance
+            if self.zeroconf is None:
+                self.zeroconf = self._get_zeroconf()
             
             try:
-                self.zeroconf.register_service(self.info)
-                logger.info(f"Registered service: {self.name} on {self.ip_address}:{self.discovery_port}")
+                # The announcements are broadcast in the background. Names are
+                # not probed for conflicts first: instance names are unique
+                # node ids and all servers share the rendezvous name on purpose
+                if self._registered:
+                    # Already announced, just refresh the records
+                    for info in self._service_infos():
+                        await self.zeroconf.async_update_service(info)
+                    logger.info("Updated service: %s on %s:%s", self.name, self.ip_address, self.discovery_port)
+                else:
+                    for info in self._service_infos():
+                        await self.zeroconf.async_register_service(
+                            info, ttl=REDISCOVER_INTERVAL, cooperating_responders=True
+                        )
+                    self._registered = True
+                    logger.info("Registered service: %s on %s:%s", self.name, self.ip_address, self.discovery_port)
             except Exception as e:
-                logger.error(f"Failed to register service: {str(e)}")
+                logger.error("Failed to register service: %s", e)
             
             # Start the browser to discover other services
-            self.browser = ServiceBrowser(self.zeroconf, "_twinshare._udp.local.", self)
+            if self.browser is None:
+                self._resolve_slots = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+                self.browser = AsyncServiceBrowser(
+                    self.zeroconf.zeroconf, SERVICE_TYPE,
+                    handlers=[self._on_service_state_change]
+                )
             
-            logger.info(f"Started discovery service on {self.ip_address}:{self.discovery_port} (UDP)")
-            logger.info(f"Network service available on {self.ip_address}:{self.network_port} (TCP)")
+            logger.info("Started discovery service on %s:%s (UDP)", self.ip_address, self.discovery_port)
+            logger.info("Network service available on %s:%s (TCP)", self.ip_address, self.network_port)
             
             # Add a manual discovery method for Docker networks
             # This helps when mDNS/Zeroconf doesn't work well in containerized environments
             logger.info("Calling manual peer discovery method")
-            self._discover_docker_peers()
+            await self._discover_docker_peers()
+            await self._connect_to_known_servers()
+            await verify_cached
             
             # Mark service as running
             self.running = True
             
             return True
         except Exception as e:
-            logger.error(f"Failed to start discovery service: {str(e)}")
+            logger.error("Failed to start discovery service: %s", e)
             return False
     
-    def _discover_docker_peers(self):
-        """Manually discover peers in Docker network by IP pattern."""
-        logger.info("Attempting manual peer discovery for Docker network")
+    def _service_infos(self):
+        """Return the Zeroconf services this node announces."""
+        if self.rendezvous_info is not None:
+            return (self.info, self.rendezvous_info)
+        return (self.info,)
+    
+    async def _find_server_by_rendezvous(self):
+        """Look up the server under the rendezvous name and add it as a peer.
         
-        if self.node_type == "server":
-            # Server is at 172.30.0.2, client is at 172.30.0.3
-            client_ip = "172.30.0.3"
-            logger.info(f"Server manually discovering client at {client_ip}")
-            self._add_peer("twinshare-client", client_ip, self.network_port)
-            
-            # Try to ping the client to verify connectivity
-            self._verify_peer_connectivity("twinshare-client", client_ip, self.network_port)
-        elif self.node_type == "client":
-            # Server is at 172.30.0.2
-            server_ip = "172.30.0.2"
-            logger.info(f"Client manually discovering server at {server_ip}")
-            self._add_peer("twinshare-server", server_ip, self.network_port)
+        Returns True when a server answered.
+        """
+        info = AsyncServiceInfo(RENDEZVOUS_TYPE, RENDEZVOUS_NAME)
+        try:
+            if not await info.async_request(self.zeroconf.zeroconf, 3000):
+                return False
+        except Exception as e:
+            logger.error("Rendezvous lookup failed: %s", e)
+            return False
+        
+        properties = info.properties or {}
+        if properties.get(_K_ROLE) != b'server' or not info.addresses:
+            return False
+        
+        port_raw = properties.get(_K_NETWORK_PORT)
+        port = int(port_raw) if port_raw is not None else info.port
+        name = properties.get(_K_NAME, b'twinshare-server').decode()
+        ip = socket.inet_ntoa(info.addresses[0])
+        logger.info("Found server %s at %s:%s via rendezvous", name, ip, port)
+        self._add_peer(name, ip, port)
+        return True
+    
+    async def _discover_docker_peers(self):
+        """Manually discover peers when mDNS browsing does not find them.
+        
+        Clients first ask for the server under the rendezvous name; otherwise
+        the Docker network is scanned for open peer ports.
+        """
+        now = time.monotonic()
+        if now < self._scan_expiry:
+            # The network is assumed unchanged until the last scan expires
+            return
+        
+        if (self.node_type == "client" and self.zeroconf is not None
+                and await self._find_server_by_rendezvous()):
+            self._scan_expiry = now + SCAN_CACHE_TTL
+            return
+        
+        prefix = _private_prefix(self.ip_address)
+        if prefix is None:
+            logger.info("Not on a private network (%s), skipping subnet scan", self.ip_address)
+            return
+        
+        logger.info("Scanning %s0/24 for peers", prefix)
+        candidates = [ip for ip in (f"{prefix}{i}" for i in range(2, 255))
+                      if ip != self.ip_address]
+        
+        # Connect to every candidate at once, bounded by a semaphore
+        semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+        results = await asyncio.gather(
+            *(self._scan_host(semaphore, ip) for ip in candidates)
+        )
+        
+        # Servers look for clients and clients look for servers
+        name = "twinshare-client" if self.node_type == "server" else "twinshare-server"
+        found = 0
+        for ip, conn in zip(candidates, results):
+            if conn is None:
+                continue
+            found += 1
+            peer_id = self._add_peer(name, ip, self.network_port)
+            if peer_id in self._peer_conns:
+                conn[1].close()
+            else:
+                # Keep the connection for the next ping
+                self._peer_conns[peer_id] = conn
+        
+        logger.info("Subnet scan found %s peers", found)
+        if found:
+            self._scan_expiry = now + SCAN_CACHE_TTL
+            return
+        
+        # Nothing answered, e.g. the other node is still starting: add the
+        # known address of the other container and scan again next round
+        fallback = DOCKER_FALLBACK_PEERS.get(self.node_type)
+        if fallback is not None:
+            name, host = fallback
+            ip = f"{prefix}{host}"
+            if ip != self.ip_address:
+                logger.info("No peers found, adding %s at %s", name, ip)
+                self._add_peer(name, ip, self.network_port)
+    
+    async def _scan_host(self, semaphore, ip):
+        """Return a connection to a host that answers the heartbeat, or None.
+        
+        Only hosts that acknowledge a PING_FRAME count as peers, so other
+        services listening on the same port are not mistaken for nodes.
+        """
+        async with semaphore:
+            try:
+                conn = await asyncio.wait_for(
+                    self._open_verified(ip), timeout=SCAN_TIMEOUT
+                )
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                return None
+        _tune_peer_socket(conn[1].get_extra_info('socket'))
+        return conn
+    
+    async def _open_verified(self, ip):
+        """Connect to the peer port of ip and exchange one heartbeat."""
+        reader, writer = await asyncio.open_connection(ip, self.network_port)
+        try:
+            writer.write(PING_FRAME)
+            await writer.drain()
+            if await reader.readexactly(len(PING_ACK)) != PING_ACK:
+                raise ConnectionError(f"Unexpected heartbeat reply from {ip}")
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+    
+    async def _connect_to_known_servers(self):
+        """Add the servers listed in the configuration as peers."""
+        # Resolve all servers at once so one slow lookup does not delay the rest
+        results = await asyncio.gather(
+            *(_resolve(server) for server in self.known_servers),
+            return_exceptions=True
+        )
+        
+        for server, ip in zip(self.known_servers, results):
+            if isinstance(ip, socket.gaierror):
+                logger.warning("Could not resolve known server %s: %s", server, ip)
+                continue
+            if isinstance(ip, Exception):
+                logger.error("Error resolving known server %s: %s", server, ip)
+                continue
             
-            # Try to ping the server to verify connectivity
-            self._verify_peer_connectivity("twinshare-server", server_ip, self.network_port)
+            self._add_peer(server, ip, self.network_port)
     
-    def _verify_peer_connectivity(self, name, ip_address, port):
-        """Verify connectivity to a peer by attempting to connect to its TCP port."""
+    async def _verify_peer_connectivity(self, peer_id):
+        """Verify connectivity to a peer by opening its pooled TCP connection.
+        
+        The connection stays in the pool and is reused by the next ping, so
+        repeated verification of a reachable peer costs no new handshake.
+        """
+        peer = self.peers[peer_id]
+        name, ip_address, port = peer['name'], peer['ip'], peer['port']
         try:
-            logger.info(f"Verifying connectivity to {name} at {ip_address}:{port}")
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(2)
-                result = s.connect_ex((ip_address, port))
-                if result == 0:
-                    logger.info(f"Successfully connected to {name} at {ip_address}:{port}")
-                    return True
-                else:
-                    logger.warning(f"Failed to connect to {name} at {ip_address}:{port}, error code: {result}")
-                    return False
+            logger.info("Verifying connectivity to %s at %s:%s", name, ip_address, port)
+            await self._ensure_conn(peer_id, peer)
+            logger.info("Successfully connected to %s at %s:%s", name, ip_address, port)
+            return True
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning("Failed to connect to %s at %s:%s: %s", name, ip_address, port, e)
+            return False
         except Exception as e:
-            logger.error(f"Error verifying connectivity to {name}: {e}")
+            logger.error("Error verifying connectivity to %s: %s", name, e)
             return False
     
+    def _insert_peer(self, peer_id, peer):
+        """Store a new peer and schedule its first probe."""
+        self.peers[peer_id] = peer
+        heapq.heappush(self._ping_heap, (peer['next_check'], peer_id))
+    
     def _add_peer(self, name, ip_address, port):
-        """Add a peer to the known peers list."""
-        peer_id = f"{name}_{ip_address}_{port}"
+        """Add a peer to the known peers list and return its id."""
+        peer_id = _peer_id(ip_address, port)
         if peer_id not in self.peers:
-            self.peers[peer_id] = {
-                'name': name,
-                'ip': ip_address,
-                'port': port,
-                'last_seen': time.time()
-            }
-            logger.info(f"Added peer: {name} at {ip_address}:{port}")
+            self._insert_peer(peer_id, _new_peer(name, ip_address, port))
+            logger.info("Added peer: %s at %s:%s", name, ip_address, port)
         else:
             # Update last seen time
             self.peers[peer_id]['last_seen'] = time.time()
-            logger.info(f"Updated peer: {name} at {ip_address}:{port}")
+            logger.info("Updated peer: %s at %s:%s", name, ip_address, port)
+        return peer_id
     
-    def stop_discovery(self):
+    async def stop_discovery(self):
         """Stop the P2P discovery service."""
         if not HAVE_DEPENDENCIES:
             logger.warning("Discovery service not available without zeroconf dependency")
@@ -241,69 +798,263 @@ class P2PNode:
                 logger.warning("Discovery service not running")
                 return
             
-            # Unregister service
-            if self.zeroconf and self.info:
-                self.zeroconf.unregister_service(self.info)
-                self.zeroconf.close()
+            # Stop browsing and unregister the service; the shared zeroconf
+            # instance stays open for a later restart
+            if self.browser is not None:
+                await self.browser.async_cancel()
+                self.browser = None
+            if self.zeroconf and self.info and self._registered:
+                # Wait for the goodbye packets to go out
+                for info in self._service_infos():
+                    await (await self.zeroconf.async_unregister_service(info))
+                self._registered = False
+            
+            if self._beacon_transport is not None:
+                self._beacon_transport.close()
+                self._beacon_transport = None
             
             self.running = False
+            self.save_peer_cache()
             logger.info("Stopped discovery service")
         except Exception as e:
-            logger.error(f"Error stopping discovery service: {e}")
+            logger.error("Error stopping discovery service: %s", e)
     
-    def ping_peers(self):
-        """Ping all known peers to check connectivity."""
+    async def ping_peers(self):
+        """Ping the known peers whose next check is due, concurrently."""
         if not self.peers:
             logger.warning("No peers to ping")
             return
         
-        logger.info(f"Pinging {len(self.peers)} peers")
+        # Pop only the peers that are due; peers added or removed by discovery
+        # while probes are in flight do not affect this round
+        now = time.monotonic()
+        heap = self._ping_heap
+        peers_snapshot = []
+        while heap and heap[0][0] <= now:
+            next_check, peer_id = heapq.heappop(heap)
+            peer = self.peers.get(peer_id)
+            if peer is not None and peer['next_check'] == next_check:
+                peers_snapshot.append((peer_id, peer))
+        if not peers_snapshot:
+            return
+        logger.info("Pinging %s of %s peers", len(peers_snapshot), len(self.peers))
         
-        for peer_id, peer in list(self.peers.items()):
-            try:
-                # Create a socket
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    # Set a timeout
-                    s.settimeout(2)
-                    
-                    # Try to connect to the peer
-                    result = s.connect_ex((peer['ip'], peer['port']))
-                    
-                    if result == 0:
-                        logger.info(f"Ping successful: {peer_id} ({peer['name']}, {peer['ip']}:{peer['port']})")
-                        peer['last_seen'] = time.time()
-                    else:
-                        logger.warning(f"Ping failed: {peer_id} ({peer['name']}, {peer['ip']}:{peer['port']})")
-            except Exception as e:
-                logger.error(f"Error pinging peer {peer_id}: {e}")
-
-    def remove_service(self, zeroconf, type, name):
-        """Remove a service from the list of known peers."""
-        logger.info(f"Service removed: {name}")
-
-    def add_service(self, zeroconf, type, name):
-        """Add a service to the list of known peers."""
+        # Probe every peer at once so unreachable peers cost one timeout in total
+        await asyncio.gather(
+            *(self._probe_peer(peer_id, peer) for peer_id, peer in peers_snapshot),
+            return_exceptions=True
+        )
+        
+        self._evict_idle_connections()
+    
+    async def _ensure_conn(self, peer_id, peer):
+        """Return the persistent connection to a peer, opening it if needed."""
+        conn = self._peer_conns.get(peer_id)
+        if conn is None:
+            conn = await asyncio.wait_for(
+                asyncio.open_connection(peer['ip'], peer['port']), timeout=2
+            )
+            _tune_peer_socket(conn[1].get_extra_info('socket'))
+            if peer_id in self._peer_conns:
+                # Another task connected to the peer meanwhile, keep its connection
+                conn[1].close()
+                return self._peer_conns[peer_id]
+            self._peer_conns[peer_id] = conn
+        return conn
+    
+    def _close_conn(self, peer_id):
+        """Close and forget the persistent connection to a peer."""
+        conn = self._peer_conns.pop(peer_id, None)
+        if conn is not None:
+            conn[1].close()
+    
+    def _evict_idle_connections(self):
+        """Close connections to peers that are gone or have not answered recently."""
+        now = time.time()
+        for peer_id in list(self._peer_conns):
+            peer = self.peers.get(peer_id)
+            if peer is None or now - peer['last_seen'] > PEER_CONN_IDLE_TIMEOUT:
+                self._close_conn(peer_id)
+    
+    async def close_peer_connections(self):
+        """Close all persistent peer connections."""
+        writers = [writer for _, writer in self._peer_conns.values()]
+        self._peer_conns.clear()
+        for writer in writers:
+            writer.close()
+        await asyncio.gather(*(w.wait_closed() for w in writers), return_exceptions=True)
+    
+    async def _probe_peer(self, peer_id, peer):
+        """Probe a single peer with a heartbeat over its persistent connection."""
+        now = time.monotonic()
+        peer['last_check'] = now
+        peer['next_check'] = now + PING_INTERVAL + random.uniform(0, PING_JITTER)
+        heapq.heappush(self._ping_heap, (peer['next_check'], peer_id))
         try:
-            info = zeroconf.get_service_info(type, name)
-            if info and hasattr(info, 'properties') and b'name' in info.properties and b'node_id' in info.properties:
-                peer_name = info.properties.get(b'name', b'unknown').decode()
-                peer_id = f"{peer_name}-{info.properties.get(b'node_id', b'unknown').decode()}"
-                
-                # Get network port from properties or use discovery port as fallback
-                network_port = int(info.properties.get(b'network_port', str(info.port).encode()).decode())
+            reader, writer = await self._ensure_conn(peer_id, peer)
+            writer.write(PING_FRAME)
+            await writer.drain()
+            await asyncio.wait_for(reader.readexactly(len(PING_ACK)), timeout=2)
+            
+            logger.info("Ping successful: %s (%s, %s:%s)", peer_id, peer['name'], peer['ip'], peer['port'])
+            peer['last_seen'] = time.time()
+            peer['healthy'] = True
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # Drop the broken connection, the next check reconnects
+            self._close_conn(peer_id)
+            peer['healthy'] = False
+            logger.warning("Ping failed: %s (%s, %s:%s)", peer_id, peer['name'], peer['ip'], peer['port'])
+        except Exception as e:
+            self._close_conn(peer_id)
+            peer['healthy'] = False
+            logger.error("Error pinging peer %s: %s", peer_id, e)
+    
+    async def handle_connection(self, reader, writer):
+        """Answer heartbeats sent by a peer over an incoming connection."""
+        addr = writer.get_extra_info('peername')
+        logger.info("Accepted connection from %s", addr)
+        try:
+            _tune_peer_socket(writer.get_extra_info('socket'))
+            while True:
+                (length,) = struct.unpack('!I', await reader.readexactly(4))
+                if length > MAX_FRAME_SIZE:
+                    logger.warning("Oversized frame (%s bytes) from %s, closing", length, addr)
+                    break
                 
-                if peer_id not in self.peers:
-                    self.peers[peer_id] = {
-                        'name': peer_name,
-                        'ip': socket.inet_ntoa(info.address),
-                        'port': network_port,
-                        'last_seen': time.time()
-                    }
-                    logger.info(f"Added peer via Zeroconf: {peer_name} at {socket.inet_ntoa(info.address)}:{network_port}")
+                payload = await reader.readexactly(length)
+                if payload == PING_PAYLOAD:
+                    writer.write(PING_ACK)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # The peer closed the connection
+            pass
         except Exception as e:
-            logger.error(f"Error adding service {name}: {e}")
+            logger.error("Error in TCP server: %s", e)
+        finally:
+            writer.close()
 
-def main():
+    async def _start_beacons(self):
+        """Listen for UDP beacons of other nodes on the discovery port."""
+        if self._beacon_transport is not None:
+            return
+        
+        try:
+            self._beacon_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _BeaconProtocol(self),
+                local_addr=('0.0.0.0', self.discovery_port),
+                allow_broadcast=True,
+                # Nodes on the same host share the port
+                reuse_port=hasattr(socket, 'SO_REUSEPORT')
+            )
+            logger.info("Listening for beacons on UDP port %s", self.discovery_port)
+        except OSError as e:
+            logger.warning("UDP beacons not available on port %s: %s", self.discovery_port, e)
+    
+    async def send_beacon(self):
+        """Broadcast this node's beacon on the discovery port."""
+        if self._beacon_transport is not None and self._beacon is not None:
+            self._beacon_transport.sendto(self._beacon, (BEACON_ADDRESS, self.discovery_port))
+    
+    def _on_beacon(self, data, ip_address):
+        """Add or refresh the peer that sent a beacon."""
+        if len(data) != BEACON.size:
+            return
+        magic, node_id, node_type, port = BEACON.unpack(data)
+        if magic != BEACON_MAGIC or node_id.hex() == self.node_id or node_type >= len(_NODE_TYPES):
+            return
+        
+        name = f"twinshare-{_NODE_TYPES[node_type]}"
+        peer = self.peers.get(_peer_id(ip_address, port))
+        if peer is not None:
+            # Known peer, a beacon per second is not worth a log line
+            peer['last_seen'] = time.time()
+        else:
+            self._add_peer(name, ip_address, port)
+    
+    def _on_service_state_change(self, zeroconf, service_type, name, state_change):
+        """Handle a _twinshare service appearing or disappearing on the network."""
+        if state_change is ServiceStateChange.Added:
+            # Fetch the service details without blocking the browser callback
+            task = asyncio.ensure_future(self._add_service(service_type, name))
+            self._zc_tasks.add(task)
+            task.add_done_callback(self._zc_tasks.discard)
+        elif state_change is ServiceStateChange.Removed:
+            logger.info("Service removed: %s", name)
+    
+    async def _add_service(self, service_type, name):
+        """Add a discovered service to the list of known peers."""
+        try:
+            # Throttle lookups when many services appear at once
+            info = AsyncServiceInfo(service_type, name)
+            async with self._resolve_slots:
+                if not await info.async_request(self.zeroconf.zeroconf, 3000):
+                    return
+            if not info.properties:
+                return
+            
+            properties = info.properties
+            name_raw = properties.get(_K_NAME)
+            node_id_raw = properties.get(_K_NODE_ID)
+            if name_raw is None or node_id_raw is None or not info.addresses:
+                return
+            
+            peer_name = name_raw.decode()
+            
+            # Get network port from properties or use discovery port as fallback
+            port_raw = properties.get(_K_NETWORK_PORT)
+            network_port = int(port_raw) if port_raw is not None else info.port
+            
+            ip = socket.inet_ntoa(info.addresses[0])
+            peer_id = _peer_id(ip, network_port)
+            peer = self.peers.get(peer_id)
+            if peer is not None:
+                # Already found by a beacon or the subnet scan
+                peer['last_seen'] = time.time()
+                return
+            self._insert_peer(peer_id, _new_peer(peer_name, ip, network_port))
+            logger.info("Added peer via Zeroconf: %s at %s:%s", peer_name, ip, network_port)
+        except Exception as e:
+            logger.error("Error adding service %s: %s", name, e)
+
+async def _run_every(interval, stop, action, run_first=False):
+    """Await action() every interval seconds until stop is set."""
+    if run_first:
+        await action()
+    while True:
+        # Sleep until the next run, waking up early on shutdown
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+        await action()
+
+async def run_node(node):
+    """Run the node's periodic tasks until SIGINT or SIGTERM is received."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    async def ping():
+        # Let an interrupted round of probes finish cleanly
+        await asyncio.shield(node.ping_peers())
+    
+    async def rediscover():
+        logger.info("Re-discovering peers")
+        await node._discover_docker_peers()
+        await node._connect_to_known_servers()
+    
+    # Every 5 seconds ping the peers whose next check is due; discovery
+    # already ran in start_discovery(), so the first re-discovery waits
+    # REDISCOVER_INTERVAL seconds
+    await asyncio.gather(
+        _run_every(5, stop, ping, run_first=True),
+        _run_every(BEACON_INTERVAL, stop, node.send_beacon, run_first=True),
+        _run_every(REDISCOVER_INTERVAL, stop, rediscover)
+    )
+
+async def main():
     """Main function for the P2P test script."""
     parser = argparse.ArgumentParser(description='P2P Test Script')
     parser.add_argument('--type', choices=['server', 'client'], default='server',
@@ -314,70 +1065,48 @@ def main():
     # Create P2P node
     node = P2PNode(args.type, config_file=args.config)
     
+    # Start the TCP server answering peer heartbeats first, so peers probing
+    # this node during its discovery already get an answer
+    server = None
+    try:
+        logger.info("Starting TCP server on %s:%s", node.ip_address, node.network_port)
+        server = await asyncio.start_server(
+            node.handle_connection, node.ip_address, node.network_port, reuse_address=True
+        )
+    except Exception as e:
+        logger.error("Failed to start TCP server: %s", e)
+    
     # Start discovery service
-    logger.info(f"Starting discovery service for {args.type} node")
-    if not node.start_discovery():
+    logger.info("Starting discovery service for %s node", args.type)
+    if not await node.start_discovery():
         logger.error("Failed to start discovery service")
+        if server:
+            server.close()
+            await server.wait_closed()
         return 1
     
-    # Create a simple TCP server to listen for connections
-    def start_tcp_server():
-        try:
-            logger.info(f"Starting TCP server on {node.ip_address}:{node.network_port}")
-            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            server_socket.bind((node.ip_address, node.network_port))
-            server_socket.listen(5)
-            server_socket.settimeout(1)  # Non-blocking with 1 second timeout
-            
-            while True:
-                try:
-                    client, addr = server_socket.accept()
-                    logger.info(f"Accepted connection from {addr}")
-                    client.send(b"Hello from " + node.name.encode())
-                    client.close()
-                except socket.timeout:
-                    # This is expected, just continue the loop
-                    pass
-                except Exception as e:
-                    logger.error(f"Error in TCP server: {e}")
-                
-                # Check if we should exit
-                if not node.running:
-                    break
-        except Exception as e:
-            logger.error(f"Failed to start TCP server: {e}")
-        finally:
-            try:
-                server_socket.close()
-            except:
-                pass
-    
-    # Start TCP server in a separate thread
-    import threading
-    tcp_thread = threading.Thread(target=start_tcp_server, daemon=True)
-    tcp_thread.start()
-    
     try:
-        # Main loop
-        while True:
-            # Ping peers every 5 seconds
-            node.ping_peers()
-            
-            # Re-discover peers every 30 seconds
-            if int(time.time()) % 30 == 0:
-                logger.info("Re-discovering peers")
-                node._discover_docker_peers()
-            
-            time.sleep(5)
-    except KeyboardInterrupt:
+        await run_node(node)
         logger.info("Stopping P2P test script")
     finally:
+        # Stop TCP server and close peer connections
+        if server:
+            server.close()
+            await server.wait_closed()
+        await node.close_peer_connections()
+        
         # Stop discovery service
-        node.running = False
-        node.stop_discovery()
+        await node.stop_discovery()
+        await P2PNode.close_zeroconf()
     
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
+    # Use the faster uvloop event loop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
+    sys.exit(asyncio.run(main()))
@@ -7,11 +7,13 @@ This is a simplified version that runs in the foreground.
 
 import os
 import sys
+import asyncio
 import logging
 from pathlib import Path
 
 # Add parent directory to path
-sys.path.insert(0, str(Path(__file__).resolve().parent))
+_PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(_PROJECT_ROOT))
 
 from src.api.rest_server import start_server
 
@@ -29,5 +31,22 @@ if __name__ == "__main__":
     
     print(f"Starting REST API server on {host}:{port}")
     
-    # Start the server
-    server = start_server(host=host, port=port)
+    async def main():
+        # Start the server and keep it running until interrupted
+        server = await start_server(host=host, port=port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+    
+    # Use the faster uvloop event loop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
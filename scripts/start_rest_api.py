@@ -20,10 +20,21 @@ from daemon import DaemonContext
 from daemon.pidfile import PIDLockFile
 
 # Dodaj katalog nadrzędny do ścieżki, aby umożliwić importowanie modułów
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_PROJECT_ROOT))
 
 from src.api.rest_server import start_server
 
+# Domyślne ścieżki plików logów i PID
+DEFAULT_LOG_FILE = "/var/log/twinshare/rest_api.log"
+DEFAULT_PID_FILE = "/run/twinshare/rest_api.pid"
+
+# Czas oczekiwania na zakończenie procesu po SIGTERM, po którym wysyłany jest SIGKILL
+STOP_TIMEOUT = 5.0
+
+# Akcje, które wywołane bez opcji nie wymagają pełnego parsera argumentów
+_SIMPLE_ACTIONS = frozenset({"status", "stop"})
+
 
 def setup_logging(log_file, debug=False):
     """
@@ -84,14 +95,14 @@ def parse_arguments():
     parser.add_argument(
         "--log-file",
         type=str,
-        default="/var/log/twinshare/rest_api.log",
+        default=DEFAULT_LOG_FILE,
         help="Ścieżka do pliku logów (domyślnie: /var/log/twinshare/rest_api.log)"
     )
     
     parser.add_argument(
         "--pid-file",
         type=str,
-        default="/run/twinshare/rest_api.pid",
+        default=DEFAULT_PID_FILE,
         help="Ścieżka do pliku PID (domyślnie: /run/twinshare/rest_api.pid)"
     )
     
@@ -110,6 +121,31 @@ def parse_arguments():
     return parser.parse_args()
 
 
+def _minimal_parse(argv):
+    """
+    Parsuje wywołanie z samą akcją status lub stop bez budowania parsera.
+    
+    Args:
+        argv: Argumenty wiersza poleceń bez nazwy skryptu
+    
+    Returns:
+        argparse.Namespace: Argumenty z wartościami domyślnymi lub None,
+        jeśli wywołanie wymaga pełnego parsowania
+    """
+    if len(argv) != 1 or argv[0] not in _SIMPLE_ACTIONS:
+        return None
+    
+    return argparse.Namespace(
+        host="0.0.0.0",
+        port=8080,
+        debug=False,
+        log_file=DEFAULT_LOG_FILE,
+        pid_file=DEFAULT_PID_FILE,
+        foreground=False,
+        action=argv[0]
+    )
+
+
 def get_pid_from_file(pid_file):
     """
     Pobiera PID z pliku PID.
@@ -165,11 +201,15 @@ def stop_process(pid):
         # Wyślij sygnał SIGTERM
         os.kill(pid, signal.SIGTERM)
         
-        # Poczekaj na zakończenie procesu
-        for _ in range(10):
+        # Poczekaj na zakończenie procesu do STOP_TIMEOUT sekund, sprawdzając
+        # najpierw co kilka milisekund, a potem coraz rzadziej
+        deadline = time.monotonic() + STOP_TIMEOUT
+        delay = 0.005
+        while time.monotonic() < deadline:
             if not is_process_running(pid):
                 return True
-            time.sleep(0.5)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
         
         # Jeśli proces nadal działa, wyślij sygnał SIGKILL
         os.kill(pid, signal.SIGKILL)
@@ -191,32 +231,45 @@ def run_server(host, port, debug, log_file):
     # Konfiguruj logowanie
     setup_logging(log_file, debug)
     
+    # Szybsza pętla zdarzeń uvloop, jeśli jest zainstalowana; instalowana
+    # dopiero tutaj, już po przejściu procesu w tryb daemona
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Uruchom serwer
-    loop = asyncio.get_event_loop()
-    server = loop.run_until_complete(start_server(host, port))
+    asyncio.run(_serve(host, port))
+
+
+async def _serve(host, port):
+    """
+    Uruchamia serwer REST API i czeka na sygnał zatrzymania.
     
-    # Obsługa sygnałów
-    def handle_signal(sig, frame):
-        logging.info(f"Otrzymano sygnał {sig}, zatrzymuję serwer...")
-        loop.run_until_complete(server.stop())
-        loop.stop()
+    Args:
+        host: Adres hosta
+        port: Port
+    """
+    server = await start_server(host, port)
     
-    signal.signal(signal.SIGINT, handle_signal)
-    signal.signal(signal.SIGTERM, handle_signal)
+    # Sygnały obsługiwane przez pętlę zdarzeń zamiast signal.signal
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
     
     try:
-        # Utrzymuj serwer działający
-        loop.run_forever()
-    except KeyboardInterrupt:
-        # Zatrzymaj serwer po naciśnięciu Ctrl+C
-        loop.run_until_complete(server.stop())
+        # Utrzymuj serwer działający do otrzymania sygnału
+        await stop.wait()
+        logging.info("Otrzymano sygnał, zatrzymuję serwer...")
     finally:
-        loop.close()
+        await server.stop()
 
 
 def main():
     """Główna funkcja skryptu."""
-    args = parse_arguments()
+    args = _minimal_parse(sys.argv[1:]) or parse_arguments()
     
     # Utwórz katalog dla pliku PID, jeśli nie istnieje
     pid_dir = os.path.dirname(args.pid_file)
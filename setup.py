@@ -4,21 +4,33 @@
 setup.py
 """
 
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="safetytwin-share",
     version="0.1.44",
     description="Twin Share - Environment Manager - narzędzie do dzielenia się środowiskami Embedded/AI/VM",
     author="Tom Sapletta",
-    packages=find_packages(),
+    # Stała lista pakietów zamiast find_packages(), bez przeszukiwania drzewa
+    packages=[
+        "src",
+        "src.api",
+        "src.api.endpoints",
+        "src.cli",
+        "src.core",
+        "src.p2p",
+        "src.runtime",
+        "src.sharing",
+        "src.utils",
+        "src.web",
+    ],
     package_dir={"": "."},
     py_modules=["twinshare_cli"],
     install_requires=[
         "libvirt-python>=8.0.0",
         "aiohttp[speedups]<4.0.0,>=3.8.0",
         "aiohttp-cors>=0.7.0",
-        "asyncio>=3.4.3",
+        "yarl>=1.6.0",
         "tabulate>=0.9.0",
         "pyyaml>=6.0",
         "cryptography>=40.0.0",
@@ -53,6 +65,12 @@ setup(
         ],
         "windows": [
             "pywin32>=300"
+        ],
+        "uvloop": [
+            "uvloop>=0.17.0; sys_platform != 'win32'"
+        ],
+        "msgpack": [
+            "msgpack>=1.0.0"
         ]
     },
     include_package_data=True,
@@ -12,7 +12,8 @@ import asyncio
 from pathlib import Path
 
 # Add the project directory to the Python path
-sys.path.insert(0, str(Path(__file__).resolve().parent))
+_PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(_PROJECT_ROOT))
 
 # Import the API server
 from src.api.rest_server import RESTServer
@@ -49,4 +50,11 @@ async def main():
         logger.info("Server stopped")
 
 if __name__ == "__main__":
+    # Use the faster uvloop event loop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     asyncio.run(main())
@@ -8,4 +8,20 @@ Twin Share - Environment Manager
 __version__ = "0.1.26"
 
 # Note: We avoid importing modules here to prevent circular imports
-# Modules will be imported as needed by the application
+# Modules will be imported as needed by the application; attribute access
+# such as `src.api` imports the subpackage on first use (PEP 562)
+
+import importlib
+
+_SUBMODULES = frozenset(
+    {"api", "cli", "core", "p2p", "runtime", "sharing", "utils", "web"}
+)
+
+
+def __getattr__(name):
+    """Import a subpackage on first access."""
+    if name not in _SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f"{__name__}.{name}")
+    globals()[name] = module
+    return module
@@ -7,12 +7,28 @@ Zapewnia interfejs API do zarządzania maszynami wirtualnymi, siecią P2P
 i innymi zasobami w środowisku AI Environment Manager.
 """
 
-from .p2p_api import P2PAPI
-from .vm_api import VMAPI
+import importlib
 
 # Eksportuj klasy API
 __all__ = ["VMAPI", "P2PAPI", "API"]
 
+# Klasy API importowane dopiero przy pierwszym użyciu (PEP 562), aby import
+# pakietu nie ładował libvirt, aiohttp i modułów P2P
+_LAZY_CLASSES = {
+    "P2PAPI": ".p2p_api",
+    "VMAPI": ".vm_api",
+}
+
+
+def __getattr__(name):
+    """Importuje klasę API przy pierwszym odwołaniu do niej."""
+    module = _LAZY_CLASSES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
 class API:
     """
@@ -23,5 +39,25 @@ class API:
 
     def __init__(self):
         """Inicjalizuje główne API"""
-        self.vm = VMAPI()
-        self.p2p = P2PAPI()
+        # Podsystemy są tworzone przy pierwszym użyciu, więc klient korzystający
+        # tylko z P2P nie łączy się z libvirt i odwrotnie
+        self._vm = None
+        self._p2p = None
+
+    @property
+    def vm(self):
+        """API maszyn wirtualnych, tworzone przy pierwszym odwołaniu."""
+        if self._vm is None:
+            from .vm_api import VMAPI
+
+            self._vm = VMAPI()
+        return self._vm
+
+    @property
+    def p2p(self):
+        """API sieci P2P, tworzone przy pierwszym odwołaniu."""
+        if self._p2p is None:
+            from .p2p_api import P2PAPI
+
+            self._p2p = P2PAPI()
+        return self._p2p
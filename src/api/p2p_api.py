@@ -8,9 +8,11 @@ umożliwiając integrację z innymi aplikacjami.
 """
 
 import asyncio
+import functools
 import json
 import logging
-from typing import Any, Dict, List, Optional, Union
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 from ..p2p.discovery import discovery
 from ..p2p.network import network
@@ -18,6 +20,34 @@ from ..p2p.protocol import Message
 
 logger = logging.getLogger("ai-env-manager.api.p2p")
 
+# Maksymalna liczba wiadomości wysyłanych jednocześnie przez broadcast_message
+MAX_CONCURRENT_SENDS = 32
+
+
+def _log_errors(message: str, default: Any = None):
+    """
+    Dekorator logujący błąd metody i zwracający w zamian wartość domyślną.
+
+    Anulowanie zadania (``asyncio.CancelledError``) nie jest przechwytywane.
+
+    Args:
+        message: Opis błędu umieszczany w logu
+        default: Wartość zwracana w przypadku błędu
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"{message}: {e}")
+                return default
+
+        return wrapper
+
+    return decorator
+
 
 class P2PAPI:
     """
@@ -29,8 +59,12 @@ class P2PAPI:
 
     def __init__(self):
         """Inicjalizuje API sieci P2P"""
-        pass
+        # Dane lokalnego węzła, które nie zmieniają się w czasie działania
+        self._local_id = discovery.peer_id
+        self._local_name = discovery.node_info["hostname"]
+        self._local_port = network.port
 
+    @_log_errors("Błąd podczas uruchamiania usług P2P", default=False)
     async def start_services(self) -> bool:
         """
         Uruchamia usługi P2P.
@@ -38,14 +72,11 @@ class P2PAPI:
         Returns:
             bool: Czy operacja się powiodła
         """
-        try:
-            discovery.start()
-            await network.start()
-            return True
-        except Exception as e:
-            logger.error(f"Błąd podczas uruchamiania usług P2P: {e}")
-            return False
+        discovery.start()
+        await network.start()
+        return True
 
+    @_log_errors("Błąd podczas zatrzymywania usług P2P", default=False)
     async def stop_services(self) -> bool:
         """
         Zatrzymuje usługi P2P.
@@ -53,13 +84,9 @@ class P2PAPI:
         Returns:
             bool: Czy operacja się powiodła
         """
-        try:
-            await network.stop()
-            discovery.stop()
-            return True
-        except Exception as e:
-            logger.error(f"Błąd podczas zatrzymywania usług P2P: {e}")
-            return False
+        await network.stop()
+        discovery.stop()
+        return True
 
     def get_peers(self) -> List[Dict[str, Any]]:
         """
@@ -80,11 +107,11 @@ class P2PAPI:
         Returns:
             Optional[Dict[str, Any]]: Informacje o węźle lub None, jeśli węzeł nie istnieje
         """
-        peers = discovery.get_peers()
-        for peer in peers:
-            if peer.get("id") == peer_id:
-                return peer
-        return None
+        # Bezpośrednio ze słownika węzłów, bez budowania listy wszystkich węzłów
+        peer = discovery.peers.get(peer_id)
+        if peer is None or peer.status != "active":
+            return None
+        return peer.to_dict()
 
     def get_local_peer_id(self) -> str:
         """
@@ -102,14 +129,17 @@ class P2PAPI:
         Returns:
             Dict[str, Any]: Informacje o lokalnym węźle
         """
+        # Adres IP jest odświeżany przy każdym rozgłoszeniu, więc nie jest
+        # zapamiętywany razem z pozostałymi danymi
         return {
-            "id": discovery.peer_id,
-            "name": discovery.peer_name,
-            "address": discovery.peer_address,
-            "port": discovery.peer_port,
-            "services": discovery.services,
+            "id": self._local_id,
+            "name": self._local_name,
+            "address": discovery.node_info["ip"],
+            "port": self._local_port,
+            "services": list(discovery.node_info["features"]),
         }
 
+    @_log_errors("Błąd podczas wysyłania wiadomości")
     async def send_message(
         self, peer_id: str, message_type: str, data: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
@@ -124,20 +154,15 @@ class P2PAPI:
         Returns:
             Optional[Dict[str, Any]]: Odpowiedź z węzła docelowego lub None, jeśli nie otrzymano odpowiedzi
         """
-        try:
-            response = await network.send_message(
-                peer_id=peer_id, message_type=message_type, data=data
-            )
-            return response
-        except Exception as e:
-            logger.error(f"Błąd podczas wysyłania wiadomości: {e}")
-            return None
+        return await network.send_message(
+            peer_id=peer_id, message_type=message_type, data=data
+        )
 
     async def broadcast_message(
         self, message_type: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """
-        Wysyła wiadomość do wszystkich węzłów.
+        Wysyła wiadomość do wszystkich osiągalnych węzłów.
 
         Args:
             message_type: Typ wiadomości
@@ -146,28 +171,43 @@ class P2PAPI:
         Returns:
             Dict[str, Any]: Słownik odpowiedzi z węzłów docelowych (peer_id -> odpowiedź)
         """
-        responses = {}
-        peers = discovery.get_peers()
+        # Węzły, które nie odpowiedziały na ostatnie sprawdzenie połączenia,
+        # są pomijane, aby nie czekać na ich limit czasu
+        peer_ids = [peer["peer_id"] for peer in discovery.alive_peers()]
 
-        for peer in peers:
-            peer_id = peer.get("id")
-            try:
-                response = await network.send_message(
+        # Wiadomości są wysyłane współbieżnie, z limitem jednoczesnych połączeń
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+        async def send(peer_id: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await network.send_message(
                     peer_id=peer_id, message_type=message_type, data=data
                 )
-                responses[peer_id] = response
-            except Exception as e:
-                logger.error(f"Błąd podczas wysyłania wiadomości do {peer_id}: {e}")
-                responses[peer_id] = {"error": str(e)}
+
+        results = await asyncio.gather(
+            *(send(peer_id) for peer_id in peer_ids), return_exceptions=True
+        )
+
+        responses = {}
+        for peer_id, response in zip(peer_ids, results):
+            if isinstance(response, Exception):
+                logger.error(
+                    f"Błąd podczas wysyłania wiadomości do {peer_id}: {response}"
+                )
+                response = {"error": str(response)}
+            responses[peer_id] = response
 
         return responses
 
+    @_log_errors("Błąd podczas wysyłania pliku")
     async def send_file(
         self, peer_id: str, file_path: str, remote_path: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Wysyła plik do węzła.
 
+        Plik jest przesyłany strumieniowo przez ``send_file_stream``.
+
         Args:
             peer_id: Identyfikator węzła docelowego
             file_path: Ścieżka do pliku
@@ -176,34 +216,72 @@ class P2PAPI:
         Returns:
             Optional[Dict[str, Any]]: Odpowiedź z węzła docelowego lub None, jeśli nie otrzymano odpowiedzi
         """
-        try:
-            response = await network.send_file(
-                peer_id=peer_id, file_path=file_path, remote_path=remote_path
-            )
-            return response
-        except Exception as e:
-            logger.error(f"Błąd podczas wysyłania pliku: {e}")
-            return None
+        return await self.send_file_stream(
+            peer_id=peer_id, file_path=file_path, remote_path=remote_path
+        )
+
+    @_log_errors("Błąd podczas wysyłania pliku")
+    async def send_file_stream(
+        self,
+        peer_id: str,
+        file_path: str,
+        remote_path: Optional[str] = None,
+        chunk_size: int = 131072,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Wysyła plik do węzła strumieniowo, bez wczytywania go w całości do pamięci.
+
+        Args:
+            peer_id: Identyfikator węzła docelowego
+            file_path: Ścieżka do pliku
+            remote_path: Ścieżka docelowa na węźle docelowym
+            chunk_size: Rozmiar fragmentu odczytywanego z dysku w bajtach
 
+        Returns:
+            Optional[Dict[str, Any]]: Odpowiedź z węzła docelowego lub None, jeśli nie otrzymano odpowiedzi
+        """
+        path = Path(file_path)
+
+        async def read_chunks() -> AsyncIterator[bytes]:
+            # Odczyt z dysku w puli wątków, aby nie blokować pętli zdarzeń
+            loop = asyncio.get_running_loop()
+            with open(path, "rb") as f:
+                while True:
+                    chunk = await loop.run_in_executor(None, f.read, chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        return await network.upload_file_stream(
+            peer_id=peer_id,
+            chunks=read_chunks(),
+            filename=path.name,
+            metadata={"remote_path": remote_path},
+        )
+
+    @_log_errors("Błąd podczas pobierania pliku")
     async def request_file(
         self, peer_id: str, remote_path: str, local_path: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Pobiera plik z węzła.
 
+        Treść pliku jest zapisywana na dysk strumieniowo, fragment po
+        fragmencie, bez wczytywania całego pliku do pamięci.
+
         Args:
             peer_id: Identyfikator węzła docelowego
-            remote_path: Ścieżka do pliku na węźle docelowym
-            local_path: Ścieżka docelowa na lokalnym węźle
+            remote_path: Identyfikator pliku na węźle docelowym (``file_id``
+                zwrócony przy przesyłaniu pliku)
+            local_path: Ścieżka docelowa na lokalnym węźle (domyślnie plik
+                o tej samej nazwie w bieżącym katalogu)
 
         Returns:
-            Optional[Dict[str, Any]]: Odpowiedź z węzła docelowego lub None, jeśli nie otrzymano odpowiedzi
+            Optional[Dict[str, Any]]: Informacje o pobranym pliku lub None w przypadku błędu
         """
-        try:
-            response = await network.request_file(
-                peer_id=peer_id, remote_path=remote_path, local_path=local_path
-            )
-            return response
-        except Exception as e:
-            logger.error(f"Błąd podczas pobierania pliku: {e}")
+        output_path = Path(local_path) if local_path else Path(Path(remote_path).name)
+        if not await network.download_file(
+            peer_id=peer_id, file_id=remote_path, output_path=output_path
+        ):
             return None
+        return {"status": "ok", "local_path": str(output_path)}
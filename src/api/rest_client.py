@@ -7,14 +7,215 @@ Zapewnia klienta REST API do zarządzania maszynami wirtualnymi, siecią P2P
 i innymi zasobami w środowisku AI Environment Manager.
 """
 
+import asyncio
+import copy
+import dataclasses
+import functools
 import json
 import logging
-from typing import Any, Dict, List, Optional, Union
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import aiohttp
+import yarl
 
 logger = logging.getLogger("ai-env-manager.api.rest_client")
 
+# Szybsza serializacja JSON przez orjson, jeśli jest zainstalowany
+try:
+    import orjson
+
+    # orjson serializuje dataklasy bezpośrednio do bajtów; klucze niebędące
+    # napisami są zamieniane na napisy, tak jak robi to json.dumps
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    _json_loads = orjson.loads
+except ImportError:
+
+    def _json_default(obj: Any) -> Any:
+        if dataclasses.is_dataclass(obj):
+            return dataclasses.asdict(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_json_default).encode("utf-8")
+
+    _json_loads = json.loads
+
+# Nagłówki żądań z treścią JSON serializowaną przez _json_dumps
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Sesje HTTP współdzielone przez klientów utworzonych z shared_session=True,
+# kluczowane pętlą zdarzeń i bazowym URL (sesja aiohttp jest związana z pętlą)
+_SESSION_CACHE: Dict[Tuple[asyncio.AbstractEventLoop, str], aiohttp.ClientSession] = {}
+
+
+async def close_shared_sessions() -> None:
+    """
+    Zamyka współdzielone sesje HTTP należące do bieżącej pętli zdarzeń.
+
+    Należy ją wywołać przed zakończeniem pętli, jeśli klienty korzystały
+    ze współdzielonych sesji.
+    """
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _SESSION_CACHE if key[0] is loop]:
+        await _SESSION_CACHE.pop(key).close()
+
+
+def _invalidated_by_writes(name: str) -> bool:
+    """
+    Sprawdza, czy odpowiedzi metody są unieważniane przez operacje na VM.
+
+    Args:
+        name: Nazwa metody klienta
+
+    Returns:
+        bool: True dla metod listujących i statusu maszyny wirtualnej
+    """
+    return name.startswith("list_") or name == "get_vm_status"
+
+
+def _ttl_cache(ttl: float):
+    """
+    Dekorator zapamiętujący wynik metody klienta przez krótki czas.
+
+    Wyniki są przechowywane w słowniku ``_cache`` instancji, więc różne
+    klienty nie współdzielą odpowiedzi. Każde wywołanie dostaje własną kopię
+    wyniku, więc jego modyfikacja nie zmienia odpowiedzi z pamięci podręcznej.
+
+    Odczyt unieważniany przez zapisy nie jest zapamiętywany, jeśli w czasie
+    jego trwania zakończyła się operacja zmieniająca stan (zmienił się licznik
+    ``_cache_generation``), bo mógł zwrócić dane sprzed zmiany.
+
+    Args:
+        ttl: Czas ważności odpowiedzi w sekundach
+    """
+
+    def decorator(fn):
+        invalidated = _invalidated_by_writes(fn.__name__)
+
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            cached = self._cache.get(key)
+            if cached is not None and cached[1] > now:
+                return copy.deepcopy(cached[0])
+
+            generation = self._cache_generation
+            value = await fn(self, *args, **kwargs)
+            if not invalidated or generation == self._cache_generation:
+                self._cache[key] = (copy.deepcopy(value), now + ttl)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def _json_body(data: Any) -> Dict[str, Any]:
+    """
+    Zwraca argumenty żądania aiohttp z treścią JSON zserializowaną do bajtów.
+
+    Bajty z serializatora trafiają do żądania bez pośredniego napisu.
+
+    Args:
+        data: Dane do wysłania lub None, jeśli żądanie nie ma treści
+
+    Returns:
+        Dict[str, Any]: Argumenty ``data`` i ``headers`` lub pusty słownik
+    """
+    if data is None:
+        return {}
+    return {"data": _json_dumps(data), "headers": _JSON_HEADERS}
+
+
+class HTTPError(Exception):
+    """
+    Błąd HTTP zwrócony przez serwer REST API.
+
+    Attributes:
+        status: Kod odpowiedzi HTTP
+        message: Komunikat błędu z serwera
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP Error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+async def _raise_http_error(response: aiohttp.ClientResponse) -> None:
+    """
+    Zgłasza HTTPError na podstawie odpowiedzi z kodem błędu.
+
+    Treść odpowiedzi jest odczytywana raz. Jeśli nie jest to JSON z polem
+    "error" (np. strona błędu z serwera proxy), komunikatem jest początek treści.
+
+    Args:
+        response: Odpowiedź serwera z kodem błędu
+
+    Raises:
+        HTTPError: Zawsze
+    """
+    body = await response.read()
+    try:
+        message = _json_loads(body)["error"]
+    except Exception:
+        message = body[:256].decode("utf-8", "replace") or "Unknown error"
+    raise HTTPError(response.status, str(message))
+
+
+@dataclasses.dataclass(frozen=True)
+class CreateVMRequest:
+    """
+    Treść żądania utworzenia maszyny wirtualnej.
+
+    orjson serializuje dataklasy bezpośrednio do bajtów, bez pośredniego
+    słownika.
+    """
+
+    name: str
+    image: str
+    cpu_cores: int = 2
+    memory: int = 2048
+    disk_size: int = 20
+    network: str = "default"
+    hypervisor: str = "kvm"
+
+
+def _invalidates_cache(fn):
+    """
+    Dekorator unieważniający listy i statusy VM po operacji zmieniającej stan.
+
+    Usuwa z pamięci podręcznej odpowiedzi metod ``list_*`` i ``get_vm_status``
+    oraz zwiększa licznik ``_cache_generation``, aby odczyty trwające w czasie
+    operacji nie zapisały nieaktualnych danych.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await fn(self, *args, **kwargs)
+        finally:
+            self._cache_generation += 1
+            for key in [key for key in self._cache if _invalidated_by_writes(key[0])]:
+                del self._cache[key]
+
+    return wrapper
+
 
 class RESTClient:
     """
@@ -24,15 +225,44 @@ class RESTClient:
     i innymi zasobami w środowisku AI Environment Manager poprzez REST API.
     """
 
-    def __init__(self, base_url: str = "http://localhost:8080"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8080",
+        timeout: Optional[float] = None,
+        connection_limit: int = 256,
+        limit_per_host: int = 64,
+        shared_session: bool = False,
+    ):
         """
         Inicjalizuje klienta REST API.
 
         Args:
             base_url: Bazowy URL serwera REST API
+            timeout: Maksymalny czas trwania pojedynczego żądania w sekundach;
+                None oznacza domyślny limit aiohttp (5 minut), wystarczający
+                dla długich operacji, takich jak tworzenie maszyn wirtualnych
+            connection_limit: Maksymalna liczba otwartych połączeń w puli
+            limit_per_host: Maksymalna liczba połączeń do jednego hosta
+            shared_session: Czy korzystać z sesji HTTP współdzielonej przez
+                wszystkie klienty tego samego serwera; taka sesja nie jest
+                zamykana przy wyjściu z kontekstu, tylko przez
+                ``close_shared_sessions``. Ustawienia puli i limitu czasu
+                pochodzą od klienta, który ją utworzył.
         """
         self.base_url = base_url.rstrip("/")
+        # Zamienia endpoint na gotowy obiekt yarl.URL; wynik jest zapamiętywany,
+        # więc aiohttp nie parsuje adresu ponownie przy każdym żądaniu
+        base_url = self.base_url
+        self._url: Callable[[str], yarl.URL] = functools.lru_cache(maxsize=1024)(
+            lambda endpoint: yarl.URL(base_url + endpoint)
+        )
+        self.timeout = timeout
+        self.connection_limit = connection_limit
+        self.limit_per_host = limit_per_host
+        self.shared_session = shared_session
         self.session = None
+        self._cache: Dict[tuple, tuple] = {}
+        self._cache_generation = 0
 
     async def __aenter__(self):
         """
@@ -41,28 +271,66 @@ class RESTClient:
         Returns:
             RESTClient: Instancja klienta REST API
         """
-        self.session = aiohttp.ClientSession()
+        await self._ensure_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """
         Zamyka sesję HTTP przy wyjściu z kontekstu.
 
+        Sesja współdzielona pozostaje otwarta dla kolejnych klientów.
+
         Args:
             exc_type: Typ wyjątku
             exc_val: Wartość wyjątku
             exc_tb: Traceback wyjątku
         """
         if self.session:
-            await self.session.close()
+            if not self.shared_session:
+                await self.session.close()
             self.session = None
 
+    def _create_session(self) -> aiohttp.ClientSession:
+        """
+        Tworzy sesję HTTP z pulą połączeń keep-alive.
+
+        Wszystkie żądania klienta korzystają z tej samej puli, dzięki czemu
+        połączenia TCP są ponownie używane zamiast nawiązywane dla każdego żądania.
+        Limit czasu (jeśli podano) jest ustawiony na poziomie sesji, więc
+        pojedyncze żądania nie wymagają dodatkowego opakowania
+        w ``asyncio.wait_for``.
+
+        Returns:
+            aiohttp.ClientSession: Sesja HTTP
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+            ttl_dns_cache=300,
+        )
+        options = {}
+        if self.timeout is not None:
+            options["timeout"] = aiohttp.ClientTimeout(total=self.timeout)
+        return aiohttp.ClientSession(connector=connector, **options)
+
     async def _ensure_session(self):
         """
         Zapewnia, że sesja HTTP jest zainicjalizowana.
         """
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            if not self.shared_session:
+                self.session = self._create_session()
+                return
+
+            # Między odczytem a zapisem nie ma punktu przełączenia,
+            # więc blokada nie jest potrzebna
+            key = (asyncio.get_running_loop(), self.base_url)
+            session = _SESSION_CACHE.get(key)
+            if session is None or session.closed:
+                session = _SESSION_CACHE[key] = self._create_session()
+            self.session = session
 
     async def _get(self, endpoint: str) -> Dict[str, Any]:
         """
@@ -75,22 +343,19 @@ class RESTClient:
             Dict[str, Any]: Odpowiedź z serwera REST API
 
         Raises:
-            Exception: Jeśli wystąpi błąd podczas wykonywania żądania
+            HTTPError: Jeśli serwer zwróci kod błędu
         """
         await self._ensure_session()
-        url = f"{self.base_url}{endpoint}"
+        url = self._url(endpoint)
 
         async with self.session.get(url) as response:
             if response.status >= 400:
-                error_data = await response.json()
-                raise Exception(
-                    f"HTTP Error {response.status}: {error_data.get('error', 'Unknown error')}"
-                )
+                await _raise_http_error(response)
 
-            return await response.json()
+            return await response.json(loads=_json_loads)
 
     async def _post(
-        self, endpoint: str, data: Optional[Dict[str, Any]] = None
+        self, endpoint: str, data: Union[Dict[str, Any], CreateVMRequest, None] = None
     ) -> Dict[str, Any]:
         """
         Wykonuje żądanie POST do serwera REST API.
@@ -103,19 +368,16 @@ class RESTClient:
             Dict[str, Any]: Odpowiedź z serwera REST API
 
         Raises:
-            Exception: Jeśli wystąpi błąd podczas wykonywania żądania
+            HTTPError: Jeśli serwer zwróci kod błędu
         """
         await self._ensure_session()
-        url = f"{self.base_url}{endpoint}"
+        url = self._url(endpoint)
 
-        async with self.session.post(url, json=data) as response:
+        async with self.session.post(url, **_json_body(data)) as response:
             if response.status >= 400:
-                error_data = await response.json()
-                raise Exception(
-                    f"HTTP Error {response.status}: {error_data.get('error', 'Unknown error')}"
-                )
+                await _raise_http_error(response)
 
-            return await response.json()
+            return await response.json(loads=_json_loads)
 
     async def _delete(
         self, endpoint: str, data: Optional[Dict[str, Any]] = None
@@ -131,22 +393,20 @@ class RESTClient:
             Dict[str, Any]: Odpowiedź z serwera REST API
 
         Raises:
-            Exception: Jeśli wystąpi błąd podczas wykonywania żądania
+            HTTPError: Jeśli serwer zwróci kod błędu
         """
         await self._ensure_session()
-        url = f"{self.base_url}{endpoint}"
+        url = self._url(endpoint)
 
-        async with self.session.delete(url, json=data) as response:
+        async with self.session.delete(url, **_json_body(data)) as response:
             if response.status >= 400:
-                error_data = await response.json()
-                raise Exception(
-                    f"HTTP Error {response.status}: {error_data.get('error', 'Unknown error')}"
-                )
+                await _raise_http_error(response)
 
-            return await response.json()
+            return await response.json(loads=_json_loads)
 
     # Metody VM
 
+    @_ttl_cache(1.5)
     async def list_vms(self) -> List[Dict[str, Any]]:
         """
         Listuje dostępne maszyny wirtualne.
@@ -157,6 +417,7 @@ class RESTClient:
         response = await self._get("/api/vm")
         return response.get("vms", [])
 
+    @_invalidates_cache
     async def create_vm(
         self,
         name: str,
@@ -182,15 +443,9 @@ class RESTClient:
         Returns:
             Dict[str, Any]: Informacje o utworzonej maszynie wirtualnej
         """
-        data = {
-            "name": name,
-            "image": image,
-            "cpu_cores": cpu_cores,
-            "memory": memory,
-            "disk_size": disk_size,
-            "network": network,
-            "hypervisor": hypervisor,
-        }
+        data = CreateVMRequest(
+            name, image, cpu_cores, memory, disk_size, network, hypervisor
+        )
 
         return await self._post("/api/vm", data)
 
@@ -206,6 +461,41 @@ class RESTClient:
         """
         return await self._get(f"/api/vm/{name}")
 
+    async def get_vm_statuses(
+        self, names: Iterable[str], max_concurrency: int = 16
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Pobiera statusy wielu maszyn wirtualnych, zwracając je w kolejności odpowiedzi.
+
+        Wszystkie żądania są wysyłane od razu (z limitem jednoczesnych żądań),
+        a wynik każdego z nich jest przekazywany, gdy tylko nadejdzie.
+
+        Args:
+            names: Nazwy maszyn wirtualnych
+            max_concurrency: Maksymalna liczba jednoczesnych żądań
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: Nazwa maszyny i jej status lub {"error": opis}
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(name: str) -> Tuple[str, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return name, await self.get_vm_status(name)
+                except Exception as e:
+                    return name, {"error": str(e)}
+
+        tasks = [asyncio.ensure_future(fetch(name)) for name in names]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Przerwanie iteracji przez wywołującego anuluje pozostałe żądania
+            for task in tasks:
+                task.cancel()
+
+    @_invalidates_cache
     async def start_vm(self, name: str) -> Dict[str, Any]:
         """
         Uruchamia maszynę wirtualną.
@@ -218,6 +508,7 @@ class RESTClient:
         """
         return await self._post(f"/api/vm/{name}/start")
 
+    @_invalidates_cache
     async def stop_vm(self, name: str, force: bool = False) -> Dict[str, Any]:
         """
         Zatrzymuje maszynę wirtualną.
@@ -232,6 +523,7 @@ class RESTClient:
         data = {"force": force}
         return await self._post(f"/api/vm/{name}/stop", data)
 
+    @_invalidates_cache
     async def delete_vm(self, name: str, delete_disk: bool = True) -> Dict[str, Any]:
         """
         Usuwa maszynę wirtualną.
@@ -248,6 +540,7 @@ class RESTClient:
 
     # Metody P2P
 
+    @_ttl_cache(1.5)
     async def get_peers(self) -> List[Dict[str, Any]]:
         """
         Pobiera listę węzłów w sieci P2P.
@@ -258,6 +551,7 @@ class RESTClient:
         response = await self._get("/api/p2p/peers")
         return response.get("peers", [])
 
+    @_ttl_cache(1.5)
     async def get_local_peer_info(self) -> Dict[str, Any]:
         """
         Pobiera informacje o lokalnym węźle P2P.
@@ -267,6 +561,7 @@ class RESTClient:
         """
         return await self._get("/api/p2p/info")
 
+    @_invalidates_cache
     async def start_p2p_services(self) -> Dict[str, Any]:
         """
         Uruchamia usługi P2P.
@@ -276,6 +571,7 @@ class RESTClient:
         """
         return await self._post("/api/p2p/start")
 
+    @_invalidates_cache
     async def stop_p2p_services(self) -> Dict[str, Any]:
         """
         Zatrzymuje usługi P2P.
@@ -285,6 +581,7 @@ class RESTClient:
         """
         return await self._post("/api/p2p/stop")
 
+    @_invalidates_cache
     async def send_message(
         self, peer_id: str, message_type: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -319,6 +616,7 @@ class RESTClient:
         response = await self._get(f"/api/remote/{peer_id}/vm")
         return response.get("vms", [])
 
+    @_invalidates_cache
     async def create_remote_vm(
         self,
         peer_id: str,
@@ -346,18 +644,13 @@ class RESTClient:
         Returns:
             Dict[str, Any]: Odpowiedź z węzła docelowego
         """
-        data = {
-            "name": name,
-            "image": image,
-            "cpu_cores": cpu_cores,
-            "memory": memory,
-            "disk_size": disk_size,
-            "network": network,
-            "hypervisor": hypervisor,
-        }
+        data = CreateVMRequest(
+            name, image, cpu_cores, memory, disk_size, network, hypervisor
+        )
 
         return await self._post(f"/api/remote/{peer_id}/vm", data)
 
+    @_invalidates_cache
     async def start_remote_vm(self, peer_id: str, vm_id: str) -> Dict[str, Any]:
         """
         Uruchamia zdalną maszynę wirtualną.
@@ -371,6 +664,7 @@ class RESTClient:
         """
         return await self._post(f"/api/remote/{peer_id}/vm/{vm_id}/start")
 
+    @_invalidates_cache
     async def stop_remote_vm(
         self, peer_id: str, vm_id: str, force: bool = False
     ) -> Dict[str, Any]:
@@ -388,6 +682,7 @@ class RESTClient:
         data = {"force": force}
         return await self._post(f"/api/remote/{peer_id}/vm/{vm_id}/stop", data)
 
+    @_invalidates_cache
     async def delete_remote_vm(
         self, peer_id: str, vm_id: str, delete_disk: bool = True
     ) -> Dict[str, Any]:
@@ -404,3 +699,116 @@ class RESTClient:
         """
         data = {"delete_disk": delete_disk}
         return await self._delete(f"/api/remote/{peer_id}/vm/{vm_id}", data)
+
+    # Operacje zbiorcze na wielu węzłach
+
+    async def _gather_limited(
+        self,
+        keys: List[Any],
+        call: Callable[..., Awaitable[Any]],
+        max_concurrency: int,
+    ) -> Dict[Any, Any]:
+        """
+        Wykonuje wywołanie dla każdego klucza współbieżnie, z limitem żądań.
+
+        Args:
+            keys: Argumenty kolejnych wywołań (pojedyncze wartości lub krotki)
+            call: Metoda klienta wywoływana dla każdego klucza
+            max_concurrency: Maksymalna liczba jednoczesnych żądań
+
+        Returns:
+            Dict[Any, Any]: Wyniki według klucza; błędy jako {"error": opis}
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(key):
+            async with semaphore:
+                return await call(*(key if isinstance(key, tuple) else (key,)))
+
+        results = await asyncio.gather(
+            *(run(key) for key in keys), return_exceptions=True
+        )
+        return {
+            key: {"error": str(result)} if isinstance(result, Exception) else result
+            for key, result in zip(keys, results)
+        }
+
+    async def list_remote_vms_many(
+        self, peer_ids: Iterable[str], max_concurrency: int = 16
+    ) -> Dict[str, Any]:
+        """
+        Listuje zdalne maszyny wirtualne na wielu węzłach jednocześnie.
+
+        Args:
+            peer_ids: Identyfikatory węzłów docelowych
+            max_concurrency: Maksymalna liczba jednoczesnych żądań
+
+        Returns:
+            Dict[str, Any]: Lista maszyn wirtualnych według węzła lub {"error": opis}
+        """
+        return await self._gather_limited(
+            list(peer_ids), self.list_remote_vms, max_concurrency
+        )
+
+    async def start_remote_vms_many(
+        self, targets: Iterable[Tuple[str, str]], max_concurrency: int = 16
+    ) -> Dict[Tuple[str, str], Any]:
+        """
+        Uruchamia wiele zdalnych maszyn wirtualnych jednocześnie.
+
+        Args:
+            targets: Pary (identyfikator węzła, identyfikator maszyny wirtualnej)
+            max_concurrency: Maksymalna liczba jednoczesnych żądań
+
+        Returns:
+            Dict[Tuple[str, str], Any]: Odpowiedzi według pary lub {"error": opis}
+        """
+        return await self._gather_limited(
+            list(targets), self.start_remote_vm, max_concurrency
+        )
+
+    async def stop_remote_vms_many(
+        self,
+        targets: Iterable[Tuple[str, str]],
+        force: bool = False,
+        max_concurrency: int = 16,
+    ) -> Dict[Tuple[str, str], Any]:
+        """
+        Zatrzymuje wiele zdalnych maszyn wirtualnych jednocześnie.
+
+        Args:
+            targets: Pary (identyfikator węzła, identyfikator maszyny wirtualnej)
+            force: Czy wymusić zatrzymanie
+            max_concurrency: Maksymalna liczba jednoczesnych żądań
+
+        Returns:
+            Dict[Tuple[str, str], Any]: Odpowiedzi według pary lub {"error": opis}
+        """
+        return await self._gather_limited(
+            list(targets),
+            functools.partial(self.stop_remote_vm, force=force),
+            max_concurrency,
+        )
+
+    async def delete_remote_vms_many(
+        self,
+        targets: Iterable[Tuple[str, str]],
+        delete_disk: bool = True,
+        max_concurrency: int = 16,
+    ) -> Dict[Tuple[str, str], Any]:
+        """
+        Usuwa wiele zdalnych maszyn wirtualnych jednocześnie.
+
+        Args:
+            targets: Pary (identyfikator węzła, identyfikator maszyny wirtualnej)
+            delete_disk: Czy usunąć dyski
+            max_concurrency: Maksymalna liczba jednoczesnych żądań
+
+        Returns:
+            Dict[Tuple[str, str], Any]: Odpowiedzi według pary lub {"error": opis}
+        """
+        return await self._gather_limited(
+            list(targets),
+            functools.partial(self.delete_remote_vm, delete_disk=delete_disk),
+            max_concurrency,
+        )
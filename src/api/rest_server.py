@@ -8,20 +8,178 @@ i innymi zasobami w środowisku AI Environment Manager.
 """
 
 import asyncio
+import functools
 import json
 import logging
 import os
-from functools import wraps
-from typing import Any, Dict, List, Optional, Union
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
 
 from aiohttp import web
-from aiohttp.web import Request, Response, json_response
+from aiohttp.web import Request, Response, StreamResponse
 
 from ..core.config import config
+from ..p2p.network import network
 from . import API
 
 logger = logging.getLogger("ai-env-manager.api.rest")
 
+# Listy dłuższe niż ta wartość są wysyłane strumieniowo, partiami elementów
+STREAM_LIST_THRESHOLD = 256
+STREAM_LIST_BATCH = 64
+
+# Pola wymagane w treści żądań
+_VM_CREATE_REQUIRED = frozenset(("name", "image"))
+_P2P_MESSAGE_REQUIRED = frozenset(("peer_id", "message_type", "data"))
+
+# Szybsza serializacja JSON przez orjson, jeśli jest zainstalowany
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    # orjson.JSONDecodeError dziedziczy po json.JSONDecodeError
+    _json_loads = orjson.loads
+except ImportError:
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
+
+def json_response(data: Any, status: int = 200) -> Response:
+    """
+    Tworzy odpowiedź JSON.
+
+    Dane są serializowane od razu do bajtów, które trafiają do treści
+    odpowiedzi bez pośredniego napisu.
+
+    Args:
+        data: Dane odpowiedzi
+        status: Kod statusu HTTP
+
+    Returns:
+        Response: Odpowiedź HTTP
+    """
+    return Response(
+        body=_json_dumps(data), status=status, content_type="application/json"
+    )
+
+
+async def json_list_response(
+    request: Request, key: str, items: Sequence[Any]
+) -> StreamResponse:
+    """
+    Tworzy odpowiedź JSON postaci {key: [...]}.
+
+    Elementy są już w pamięci jako pełna lista; partiami odbywa się jedynie
+    ich kodowanie do JSON i wysyłanie, dzięki czemu nie powstaje jeden bufor
+    z całą zakodowaną treścią. Krótkie listy są wysyłane jedną odpowiedzią.
+
+    Błąd po wysłaniu nagłówków nie może już zmienić statusu odpowiedzi,
+    dlatego jest logowany, a połączenie zostaje przerwane, aby klient
+    nie otrzymał uciętego dokumentu jako poprawnej odpowiedzi.
+
+    Args:
+        request: Żądanie HTTP
+        key: Nazwa pola z listą
+        items: Elementy listy
+
+    Returns:
+        StreamResponse: Odpowiedź HTTP
+    """
+    if len(items) <= STREAM_LIST_THRESHOLD:
+        return json_response({key: items})
+
+    response = StreamResponse()
+    response.content_type = "application/json"
+    await response.prepare(request)
+    try:
+        await response.write(b"{" + _json_dumps(key) + b":[")
+        for start in range(0, len(items), STREAM_LIST_BATCH):
+            batch = b",".join(
+                _json_dumps(item) for item in items[start : start + STREAM_LIST_BATCH]
+            )
+            await response.write(batch if start == 0 else b"," + batch)
+        await response.write(b"]}")
+        await response.write_eof()
+    except Exception as e:
+        logger.error(f"Error streaming {key} list: {e}")
+        response.force_close()
+        if request.transport is not None:
+            request.transport.abort()
+    return response
+
+
+# Treści odpowiedzi, które nie zależą od żądania, serializowane raz
+_ROOT_BODY = _json_dumps(
+    {
+        "name": "AI Environment Manager API",
+        "version": "0.1.0",
+        "endpoints": ["/api/vm", "/api/p2p", "/api/remote"],
+    }
+)
+_SHARED_LIST_BODY = _json_dumps({"shared_workspaces": []})
+
+
+async def read_json(request: Request) -> Any:
+    """
+    Odczytuje treść żądania i dekoduje ją jako JSON.
+
+    Args:
+        request: Żądanie HTTP
+
+    Returns:
+        Any: Zdekodowane dane lub None, jeśli żądanie nie ma treści
+
+    Raises:
+        json.JSONDecodeError: Jeśli treść nie jest poprawnym JSON-em
+    """
+    body = await request.read()
+    return _json_loads(body) if body else None
+
+
+async def read_optional_json(request: Request) -> Dict[str, Any]:
+    """
+    Odczytuje opcjonalny obiekt JSON z treści żądania.
+
+    Jeśli żądanie nie ma treści, nie jest ona odczytywana ani dekodowana.
+
+    Args:
+        request: Żądanie HTTP
+
+    Returns:
+        Dict[str, Any]: Zdekodowany obiekt lub pusty słownik, jeśli treści
+        nie ma albo nie jest ona obiektem JSON
+    """
+    if not request.can_read_body or request.content_length == 0:
+        return {}
+    try:
+        data = await read_json(request)
+    except json.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@lru_cache(maxsize=64)
+def _error_body(message: str) -> bytes:
+    """
+    Zwraca zserializowaną treść odpowiedzi błędu.
+
+    Powtarzające się komunikaty (np. błędy walidacji) są serializowane raz.
+
+    Args:
+        message: Komunikat błędu
+
+    Returns:
+        bytes: Treść odpowiedzi JSON
+    """
+    return _json_dumps({"error": message})
+
 
 def json_error(status_code: int, message: str) -> Response:
     """
@@ -34,12 +192,17 @@ def json_error(status_code: int, message: str) -> Response:
     Returns:
         Response: Odpowiedź HTTP
     """
-    return json_response({"error": message}, status=status_code)
+    return Response(
+        body=_error_body(message), status=status_code, content_type="application/json"
+    )
 
 
 def require_json(f):
     """
-    Dekorator wymagający, aby żądanie zawierało dane JSON.
+    Dekorator wymagający, aby żądanie zawierało obiekt JSON.
+
+    Treść jest dekodowana raz i przekazywana handlerowi
+    w ``request["json_body"]``.
 
     Args:
         f: Funkcja do udekorowania
@@ -51,9 +214,12 @@ def require_json(f):
     @wraps(f)
     async def wrapper(request: Request) -> Response:
         try:
-            await request.json()
+            data = await read_json(request)
         except json.JSONDecodeError:
             return json_error(400, "Invalid JSON")
+        if not isinstance(data, dict):
+            return json_error(400, "Invalid JSON")
+        request["json_body"] = data
         return await f(request)
 
     return wrapper
@@ -67,60 +233,130 @@ class RESTServer:
     i innymi zasobami w środowisku AI Environment Manager.
     """
 
-    def __init__(self, host: str = "0.0.0.0", port: int = 8080):
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        reuse_port: bool = False,
+        backlog: int = 2048,
+    ):
         """
         Inicjalizuje serwer REST API.
 
         Args:
             host: Adres hosta
             port: Port
+            reuse_port: Czy ustawić SO_REUSEPORT, aby kilka procesów mogło
+                nasłuchiwać na tym samym porcie
+            backlog: Maksymalna długość kolejki oczekujących połączeń
         """
         self.host = host
         self.port = port
+        self.reuse_port = reuse_port
+        self.backlog = backlog
         self.app = web.Application()
         self.api = API()
         self._setup_routes()
 
-    def _setup_routes(self) -> None:
-        """Konfiguruje trasy API."""
-        # Główna trasa
-        self.app.router.add_get("/", self.handle_root)
-
-        # Trasy VM
-        self.app.router.add_get("/api/vm", self.handle_vm_list)
-        self.app.router.add_post("/api/vm", self.handle_vm_create)
-        self.app.router.add_get("/api/vm/{name}", self.handle_vm_info)
-        self.app.router.add_post("/api/vm/{name}/start", self.handle_vm_start)
-        self.app.router.add_post("/api/vm/{name}/stop", self.handle_vm_stop)
-        self.app.router.add_delete("/api/vm/{name}", self.handle_vm_delete)
-
-        # Trasy P2P
-        self.app.router.add_get("/api/p2p/peers", self.handle_p2p_peers)
-        self.app.router.add_get("/api/p2p/info", self.handle_p2p_info)
-        self.app.router.add_post("/api/p2p/start", self.handle_p2p_start)
-        self.app.router.add_post("/api/p2p/stop", self.handle_p2p_stop)
-        self.app.router.add_post("/api/p2p/message", self.handle_p2p_send_message)
-
-        # Trasy zdalnego zarządzania
-        self.app.router.add_get("/api/remote/{peer_id}/vm", self.handle_remote_vm_list)
-        self.app.router.add_post(
-            "/api/remote/{peer_id}/vm", self.handle_remote_vm_create
+        # Operacje na lokalnych maszynach wirtualnych są blokujące (libvirt,
+        # procesy zewnętrzne), więc wykonujemy je w puli wątków
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.get("api.rest.vm_workers", 16),
+            thread_name_prefix="vm-io",
         )
-        self.app.router.add_post(
-            "/api/remote/{peer_id}/vm/{vm_id}/start", self.handle_remote_vm_start
+        # Operacje zmieniające stan VM modyfikują wspólny słownik running_vms
+        # i plik stanu, więc wykonuje je po kolei jeden wątek
+        self.write_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="vm-write"
         )
-        self.app.router.add_post(
-            "/api/remote/{peer_id}/vm/{vm_id}/stop", self.handle_remote_vm_stop
+
+        # Zdalne handlery korzystają z sesji HTTP modułu sieciowego P2P,
+        # która jest zamykana razem z serwerem
+        self.app.on_cleanup.append(self._close_client_session)
+
+    async def _close_client_session(self, app: web.Application) -> None:
+        """
+        Zamyka sesję HTTP używaną do komunikacji z innymi węzłami.
+
+        Args:
+            app: Aplikacja aiohttp
+        """
+        await network.close_session()
+
+    async def _run_blocking(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Wykonuje blokującą funkcję w puli wątków serwera.
+
+        Args:
+            fn: Funkcja do wykonania
+            *args: Argumenty pozycyjne funkcji
+            **kwargs: Argumenty nazwane funkcji
+
+        Returns:
+            Any: Wynik funkcji
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
         )
-        self.app.router.add_delete(
-            "/api/remote/{peer_id}/vm/{vm_id}", self.handle_remote_vm_delete
+
+    async def _run_serialized(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Wykonuje blokującą funkcję zmieniającą stan VM w wątku zapisu.
+
+        Kolejne wywołania są wykonywane po kolei, więc współbieżne żądania
+        nie zmieniają stanu maszyn wirtualnych jednocześnie.
+
+        Args:
+            fn: Funkcja do wykonania
+            *args: Argumenty pozycyjne funkcji
+            **kwargs: Argumenty nazwane funkcji
+
+        Returns:
+            Any: Wynik funkcji
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.write_executor, functools.partial(fn, *args, **kwargs)
         )
 
-        # Trasy udostępniania workspace'ów
-        self.app.router.add_get("/shared", self.handle_shared_list)
-        self.app.router.add_post("/shared/{workspace_name}", self.handle_shared_update)
-        self.app.router.add_delete(
-            "/shared/{workspace_name}", self.handle_shared_delete
+    def _setup_routes(self) -> None:
+        """Konfiguruje trasy API."""
+        self.app.add_routes(
+            [
+                # Główna trasa
+                web.get("/", self.handle_root),
+                # Trasy VM
+                web.get("/api/vm", self.handle_vm_list),
+                web.post("/api/vm", self.handle_vm_create),
+                web.get("/api/vm/{name}", self.handle_vm_info),
+                web.post("/api/vm/{name}/start", self.handle_vm_start),
+                web.post("/api/vm/{name}/stop", self.handle_vm_stop),
+                web.delete("/api/vm/{name}", self.handle_vm_delete),
+                # Trasy P2P
+                web.get("/api/p2p/peers", self.handle_p2p_peers),
+                web.get("/api/p2p/info", self.handle_p2p_info),
+                web.post("/api/p2p/start", self.handle_p2p_start),
+                web.post("/api/p2p/stop", self.handle_p2p_stop),
+                web.post("/api/p2p/message", self.handle_p2p_send_message),
+                # Trasy zdalnego zarządzania
+                web.get("/api/remote/{peer_id}/vm", self.handle_remote_vm_list),
+                web.post("/api/remote/{peer_id}/vm", self.handle_remote_vm_create),
+                web.post(
+                    "/api/remote/{peer_id}/vm/{vm_id}/start",
+                    self.handle_remote_vm_start,
+                ),
+                web.post(
+                    "/api/remote/{peer_id}/vm/{vm_id}/stop", self.handle_remote_vm_stop
+                ),
+                web.delete(
+                    "/api/remote/{peer_id}/vm/{vm_id}", self.handle_remote_vm_delete
+                ),
+                # Trasy udostępniania workspace'ów
+                web.get("/shared", self.handle_shared_list),
+                web.post("/shared/{workspace_name}", self.handle_shared_update),
+                web.delete("/shared/{workspace_name}", self.handle_shared_delete),
+            ]
         )
 
     async def handle_root(self, request: Request) -> Response:
@@ -133,13 +369,7 @@ class RESTServer:
         Returns:
             Response: Odpowiedź HTTP
         """
-        return json_response(
-            {
-                "name": "AI Environment Manager API",
-                "version": "0.1.0",
-                "endpoints": ["/api/vm", "/api/p2p", "/api/remote"],
-            }
-        )
+        return Response(body=_ROOT_BODY, content_type="application/json")
 
     # Handlery VM
 
@@ -154,8 +384,8 @@ class RESTServer:
             Response: Odpowiedź HTTP
         """
         try:
-            vms = self.api.vm.list_vms()
-            return json_response({"vms": vms})
+            vms = await self._run_blocking(self.api.vm.list_vms)
+            return await json_list_response(request, "vms", vms)
         except Exception as e:
             logger.error(f"Error listing VMs: {e}")
             return json_error(500, str(e))
@@ -172,13 +402,14 @@ class RESTServer:
             Response: Odpowiedź HTTP
         """
         try:
-            data = await request.json()
+            data = request["json_body"]
 
             # Wymagane pola
-            required_fields = ["name", "image"]
-            for field in required_fields:
-                if field not in data:
-                    return json_error(400, f"Missing required field: {field}")
+            missing = _VM_CREATE_REQUIRED - data.keys()
+            if missing:
+                return json_error(
+                    400, f"Missing required field: {', '.join(sorted(missing))}"
+                )
 
             # Opcjonalne pola
             cpu_cores = data.get("cpu_cores", 2)
@@ -188,7 +419,8 @@ class RESTServer:
             hypervisor = data.get("hypervisor", "kvm")
 
             # Utwórz VM
-            result = self.api.vm.create_vm(
+            result = await self._run_serialized(
+                self.api.vm.create_vm,
                 name=data["name"],
                 image=data["image"],
                 cpu_cores=cpu_cores,
@@ -215,7 +447,7 @@ class RESTServer:
         """
         try:
             name = request.match_info["name"]
-            status = self.api.vm.get_vm_status(name)
+            status = await self._run_blocking(self.api.vm.get_vm_status, name)
             return json_response(status)
         except Exception as e:
             logger.error(f"Error getting VM info: {e}")
@@ -233,7 +465,7 @@ class RESTServer:
         """
         try:
             name = request.match_info["name"]
-            result = self.api.vm.start_vm(name)
+            result = await self._run_serialized(self.api.vm.start_vm, name)
             return json_response({"success": result})
         except Exception as e:
             logger.error(f"Error starting VM: {e}")
@@ -252,16 +484,11 @@ class RESTServer:
         try:
             name = request.match_info["name"]
 
-            # Sprawdź, czy żądanie zawiera dane JSON
-            force = False
-            try:
-                data = await request.json()
-                force = data.get("force", False)
-            except json.JSONDecodeError:
-                # Brak danych JSON, używamy domyślnych wartości
-                pass
+            # Opcjonalne parametry w treści żądania
+            data = await read_optional_json(request)
+            force = data.get("force", False)
 
-            result = self.api.vm.stop_vm(name, force=force)
+            result = await self._run_serialized(self.api.vm.stop_vm, name, force=force)
             return json_response({"success": result})
         except Exception as e:
             logger.error(f"Error stopping VM: {e}")
@@ -280,16 +507,13 @@ class RESTServer:
         try:
             name = request.match_info["name"]
 
-            # Sprawdź, czy żądanie zawiera dane JSON
-            delete_disk = True
-            try:
-                data = await request.json()
-                delete_disk = data.get("delete_disk", True)
-            except json.JSONDecodeError:
-                # Brak danych JSON, używamy domyślnych wartości
-                pass
+            # Opcjonalne parametry w treści żądania
+            data = await read_optional_json(request)
+            delete_disk = data.get("delete_disk", True)
 
-            result = self.api.vm.delete_vm(name, delete_disk=delete_disk)
+            result = await self._run_serialized(
+                self.api.vm.delete_vm, name, delete_disk=delete_disk
+            )
             return json_response({"success": result})
         except Exception as e:
             logger.error(f"Error deleting VM: {e}")
@@ -309,7 +533,7 @@ class RESTServer:
         """
         try:
             peers = self.api.p2p.get_peers()
-            return json_response({"peers": peers})
+            return await json_list_response(request, "peers", peers)
         except Exception as e:
             logger.error(f"Error listing P2P peers: {e}")
             return json_error(500, str(e))
@@ -377,13 +601,14 @@ class RESTServer:
             Response: Odpowiedź HTTP
         """
         try:
-            data = await request.json()
+            data = request["json_body"]
 
             # Wymagane pola
-            required_fields = ["peer_id", "message_type", "data"]
-            for field in required_fields:
-                if field not in data:
-                    return json_error(400, f"Missing required field: {field}")
+            missing = _P2P_MESSAGE_REQUIRED - data.keys()
+            if missing:
+                return json_error(
+                    400, f"Missing required field: {', '.join(sorted(missing))}"
+                )
 
             # Wyślij wiadomość
             response = await self.api.p2p.send_message(
@@ -412,7 +637,7 @@ class RESTServer:
         try:
             peer_id = request.match_info["peer_id"]
             vms = await self.api.vm.list_remote_vms(peer_id)
-            return json_response({"vms": vms})
+            return await json_list_response(request, "vms", vms)
         except Exception as e:
             logger.error(f"Error listing remote VMs: {e}")
             return json_error(500, str(e))
@@ -430,13 +655,14 @@ class RESTServer:
         """
         try:
             peer_id = request.match_info["peer_id"]
-            data = await request.json()
+            data = request["json_body"]
 
             # Wymagane pola
-            required_fields = ["name", "image"]
-            for field in required_fields:
-                if field not in data:
-                    return json_error(400, f"Missing required field: {field}")
+            missing = _VM_CREATE_REQUIRED - data.keys()
+            if missing:
+                return json_error(
+                    400, f"Missing required field: {', '.join(sorted(missing))}"
+                )
 
             # Opcjonalne pola
             cpu_cores = data.get("cpu_cores", 2)
@@ -496,14 +722,9 @@ class RESTServer:
             peer_id = request.match_info["peer_id"]
             vm_id = request.match_info["vm_id"]
 
-            # Sprawdź, czy żądanie zawiera dane JSON
-            force = False
-            try:
-                data = await request.json()
-                force = data.get("force", False)
-            except json.JSONDecodeError:
-                # Brak danych JSON, używamy domyślnych wartości
-                pass
+            # Opcjonalne parametry w treści żądania
+            data = await read_optional_json(request)
+            force = data.get("force", False)
 
             result = await self.api.vm.stop_remote_vm(peer_id, vm_id, force=force)
             return json_response(result)
@@ -525,14 +746,9 @@ class RESTServer:
             peer_id = request.match_info["peer_id"]
             vm_id = request.match_info["vm_id"]
 
-            # Sprawdź, czy żądanie zawiera dane JSON
-            delete_disk = True
-            try:
-                data = await request.json()
-                delete_disk = data.get("delete_disk", True)
-            except json.JSONDecodeError:
-                # Brak danych JSON, używamy domyślnych wartości
-                pass
+            # Opcjonalne parametry w treści żądania
+            data = await read_optional_json(request)
+            delete_disk = data.get("delete_disk", True)
 
             result = await self.api.vm.delete_remote_vm(
                 peer_id, vm_id, delete_disk=delete_disk
@@ -554,16 +770,9 @@ class RESTServer:
         Returns:
             Response: Odpowiedź HTTP
         """
-        try:
-            # W rzeczywistej implementacji, pobierz listę udostępnionych workspace'ów
-            # Na razie zwracamy pustą listę
-            shared_workspaces = []
-            return json_response({"shared_workspaces": shared_workspaces})
-        except Exception as e:
-            logger.error(f"Błąd podczas listowania udostępnionych workspace'ów: {e}")
-            return json_error(
-                500, f"Błąd podczas listowania udostępnionych workspace'ów: {e}"
-            )
+        # W rzeczywistej implementacji, pobierz listę udostępnionych workspace'ów
+        # Na razie zwracamy pustą listę
+        return Response(body=_SHARED_LIST_BODY, content_type="application/json")
 
     @require_json
     async def handle_shared_update(self, request: Request) -> Response:
@@ -578,7 +787,7 @@ class RESTServer:
         """
         try:
             workspace_name = request.match_info["workspace_name"]
-            data = await request.json()
+            data = request["json_body"]
 
             if "enable" not in data:
                 return json_error(400, "Brak wymaganego pola 'enable'")
@@ -629,7 +838,13 @@ class RESTServer:
         """Uruchamia serwer REST API."""
         runner = web.AppRunner(self.app)
         await runner.setup()
-        site = web.TCPSite(runner, self.host, self.port)
+        site = web.TCPSite(
+            runner,
+            self.host,
+            self.port,
+            backlog=self.backlog,
+            reuse_port=self.reuse_port,
+        )
         await site.start()
 
         logger.info(f"REST API server started at http://{self.host}:{self.port}")
@@ -641,25 +856,166 @@ class RESTServer:
     async def stop(self) -> None:
         """Zatrzymuje serwer REST API."""
         await self.runner.cleanup()
+        self.executor.shutdown(wait=False)
+        self.write_executor.shutdown(wait=False)
         logger.info("REST API server stopped")
 
 
-async def start_server(host: str = "0.0.0.0", port: int = 8080) -> RESTServer:
+async def start_server(
+    host: str = "0.0.0.0", port: int = 8080, reuse_port: bool = False
+) -> RESTServer:
     """
     Uruchamia serwer REST API.
 
     Args:
         host: Adres hosta
         port: Port
+        reuse_port: Czy ustawić SO_REUSEPORT na gnieździe nasłuchującym
 
     Returns:
         RESTServer: Instancja serwera REST API
     """
-    server = RESTServer(host, port)
+    server = RESTServer(host, port, reuse_port=reuse_port)
     await server.start()
     return server
 
 
+async def serve(
+    host: str = "0.0.0.0", port: int = 8080, reuse_port: bool = False
+) -> None:
+    """
+    Uruchamia serwer REST API i utrzymuje go do anulowania zadania.
+
+    Args:
+        host: Adres hosta
+        port: Port
+        reuse_port: Czy ustawić SO_REUSEPORT na gnieździe nasłuchującym
+    """
+    server = await start_server(host, port, reuse_port)
+    try:
+        # Utrzymuj serwer działający do przerwania
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def _run(host: str, port: int, reuse_port: bool) -> None:
+    """Uruchamia serwer w nowej pętli zdarzeń do naciśnięcia Ctrl+C."""
+    try:
+        asyncio.run(serve(host, port, reuse_port))
+    except KeyboardInterrupt:
+        # Serwer został zatrzymany po naciśnięciu Ctrl+C
+        pass
+
+
+def run_workers(workers: int = 1, host: str = "0.0.0.0", port: int = 8080) -> None:
+    """
+    Uruchamia serwer REST API w kilku procesach nasłuchujących na tym samym porcie.
+
+    Przy więcej niż jednym procesie gniazda mają ustawione SO_REUSEPORT,
+    a jądro rozdziela między nie przychodzące połączenia. Każdy proces ma
+    własny stan sieci P2P, więc tryb wieloprocesowy jest przeznaczony przede
+    wszystkim dla endpointów maszyn wirtualnych. Wymaga systemu z os.fork().
+
+    Args:
+        workers: Liczba procesów serwera
+        host: Adres hosta
+        port: Port
+    """
+    reuse_port = workers > 1
+
+    # Procesy potomne są tworzone przed uruchomieniem pętli zdarzeń
+    children: List[int] = []
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            _run_child(host, port, reuse_port)
+        children.append(pid)
+
+    forwarded = False
+
+    def _forward_signal(signum: int, frame: Any) -> None:
+        # Przekaż sygnał procesom potomnym i zatrzymaj własny serwer
+        nonlocal forwarded
+        _ignore_stop_signals()
+        forwarded = True
+        _signal_children(children, signum)
+        raise KeyboardInterrupt
+
+    if children:
+        signal.signal(signal.SIGTERM, _forward_signal)
+        signal.signal(signal.SIGINT, _forward_signal)
+
+    try:
+        _run(host, port, reuse_port)
+    finally:
+        if not forwarded:
+            # Serwer zakończył się sam; zatrzymaj również procesy potomne
+            _ignore_stop_signals()
+            _signal_children(children, signal.SIGTERM)
+        for pid in children:
+            _, status = os.waitpid(pid, 0)
+            if os.WIFSIGNALED(status):
+                logger.error(
+                    f"Proces serwera {pid} zakończony sygnałem {os.WTERMSIG(status)}"
+                )
+            elif os.WIFEXITED(status) and os.WEXITSTATUS(status) != 0:
+                logger.error(
+                    f"Proces serwera {pid} zakończył się z kodem "
+                    f"{os.WEXITSTATUS(status)}"
+                )
+
+
+def _run_child(host: str, port: int, reuse_port: bool) -> None:
+    """
+    Uruchamia serwer w procesie potomnym i kończy proces.
+
+    Kod wyjścia 1 oznacza, że serwer zakończył się błędem.
+
+    Args:
+        host: Adres hosta
+        port: Port
+        reuse_port: Czy ustawić SO_REUSEPORT na gnieździe nasłuchującym
+    """
+    exit_code = 1
+
+    def _stop(signum: int, frame: Any) -> None:
+        _ignore_stop_signals()
+        raise KeyboardInterrupt
+
+    try:
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+        _run(host, port, reuse_port)
+        exit_code = 0
+    except BaseException:
+        logger.exception(f"Błąd procesu serwera {os.getpid()}")
+    finally:
+        logging.shutdown()
+        os._exit(exit_code)
+
+
+def _ignore_stop_signals() -> None:
+    """Ignoruje kolejne sygnały zatrzymania podczas zamykania serwera."""
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _signal_children(children: Sequence[int], signum: int) -> None:
+    """
+    Wysyła sygnał do procesów potomnych, które jeszcze działają.
+
+    Args:
+        children: Identyfikatory procesów potomnych
+        signum: Numer sygnału
+    """
+    for pid in children:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
 if __name__ == "__main__":
     # Konfiguracja logowania
     logging.basicConfig(
@@ -668,15 +1024,12 @@ if __name__ == "__main__":
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    # Uruchom serwer
-    loop = asyncio.get_event_loop()
-    server = loop.run_until_complete(start_server())
-
+    # Szybsza pętla zdarzeń uvloop, jeśli jest zainstalowana
     try:
-        # Utrzymuj serwer działający
-        loop.run_forever()
-    except KeyboardInterrupt:
-        # Zatrzymaj serwer po naciśnięciu Ctrl+C
-        loop.run_until_complete(server.stop())
-    finally:
-        loop.close()
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+
+    run_workers(config.get("api.rest.workers", 1))
@@ -16,9 +16,10 @@ import time
 import uuid
 import zlib
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from ..core.config import Config, config
+from .protocol import msgpack
 
 logger = logging.getLogger("ai-env-manager.p2p.discovery")
 
@@ -34,6 +35,8 @@ class PeerInfo:
         self.last_seen = datetime.now().isoformat()
         self.environments = []
         self.status = "active"
+        # Wynik ostatniego sprawdzenia połączenia (None - jeszcze nie sprawdzono)
+        self.alive = None
         self.version = ""
         self.features = []
 
@@ -57,6 +60,7 @@ class PeerInfo:
             "last_seen": self.last_seen,
             "environments": self.environments,
             "status": self.status,
+            "alive": self.alive,
             "version": self.version,
             "features": self.features,
         }
@@ -70,6 +74,11 @@ class P2PDiscovery:
         self.listen_thread = None
         self.broadcast_thread = None
         self.peers = {}  # peer_id -> PeerInfo
+        self._by_hostname = {}  # hostname -> PeerInfo
+        self._by_ip = {}  # ip -> PeerInfo
+        # Licznik zmian węzłów i migawka aktywnych węzłów zbudowana przy danej wersji
+        self._peers_version = 0
+        self._snapshot = (-1, ())
         self.callbacks = []
         self.port = config.get("p2p.discovery.port", 37777)
         self.broadcast_interval = config.get("p2p.discovery.broadcast_interval", 10)
@@ -142,11 +151,58 @@ class P2PDiscovery:
         self.callbacks.append(callback)
 
     def get_peers(self) -> List[Dict[str, Any]]:
-        """Zwraca listę aktywnych węzłów"""
+        """Zwraca listę aktywnych węzłów jako kopie, które można modyfikować"""
+        return [dict(peer) for peer in self.peers_snapshot()]
+
+    def peers_snapshot(self) -> Tuple[Dict[str, Any], ...]:
+        """
+        Zwraca niezmienną migawkę aktywnych węzłów.
+
+        Migawka jest budowana ponownie tylko po zmianie węzłów, więc kolejne
+        wywołania bez zmian nie tworzą nowych słowników. Zwróconych słowników
+        nie należy modyfikować.
+
+        Returns:
+            Tuple[Dict[str, Any], ...]: Informacje o aktywnych węzłach
+        """
         self._cleanup_peers()
-        return [
-            peer.to_dict() for peer in self.peers.values() if peer.status == "active"
-        ]
+        version = self._peers_version
+        cached_version, snapshot = self._snapshot
+        if cached_version != version:
+            snapshot = tuple(
+                peer.to_dict()
+                for peer in list(self.peers.values())
+                if peer.status == "active"
+            )
+            self._snapshot = (version, snapshot)
+        return snapshot
+
+    def alive_peers(self) -> Tuple[Dict[str, Any], ...]:
+        """
+        Zwraca aktywne węzły, które nie zawiodły ostatniego sprawdzenia połączenia.
+
+        Węzły jeszcze niesprawdzone są uwzględniane, aby nowe węzły
+        otrzymywały wiadomości przed pierwszym sprawdzeniem.
+
+        Returns:
+            Tuple[Dict[str, Any], ...]: Informacje o osiągalnych węzłach
+        """
+        return tuple(
+            peer for peer in self.peers_snapshot() if peer["alive"] is not False
+        )
+
+    def mark_alive(self, peer_id: str, alive: bool) -> None:
+        """
+        Zapisuje wynik sprawdzenia połączenia z węzłem.
+
+        Args:
+            peer_id: Identyfikator węzła
+            alive: Czy węzeł odpowiedział
+        """
+        peer = self.peers.get(peer_id)
+        if peer is not None and peer.alive is not alive:
+            peer.alive = alive
+            self._peers_version += 1
 
     def get_peer(self, peer_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -158,16 +214,38 @@ class P2PDiscovery:
         Returns:
             Optional[Dict[str, Any]]: Informacje o węźle lub None jeśli nie znaleziono
         """
-        # Najpierw sprawdź, czy mamy węzeł o podanym ID
-        if peer_id in self.peers:
-            return self.peers[peer_id].to_dict()
+        # Najpierw sprawdź ID, potem indeksy nazw hostów i adresów IP
+        peer = (
+            self.peers.get(peer_id)
+            or self._by_hostname.get(peer_id)
+            or self._by_ip.get(peer_id)
+        )
+        return peer.to_dict() if peer else None
+
+    def _index_peer(
+        self,
+        peer: PeerInfo,
+        old_hostname: Optional[str] = None,
+        old_ip: Optional[str] = None,
+    ) -> None:
+        """
+        Aktualizuje indeksy węzłów po nazwie hosta i adresie IP.
 
-        # Jeśli nie znaleziono po ID, spróbuj znaleźć po nazwie hosta lub adresie IP
-        for peer in self.peers.values():
-            if peer.hostname == peer_id or peer.ip == peer_id:
-                return peer.to_dict()
+        Args:
+            peer: Dodany lub zaktualizowany węzeł
+            old_hostname: Poprzednia nazwa hosta węzła
+            old_ip: Poprzedni adres IP węzła
+        """
+        if (
+            old_hostname != peer.hostname
+            and self._by_hostname.get(old_hostname) is peer
+        ):
+            del self._by_hostname[old_hostname]
+        if old_ip != peer.ip and self._by_ip.get(old_ip) is peer:
+            del self._by_ip[old_ip]
 
-        return None
+        self._by_hostname[peer.hostname] = peer
+        self._by_ip[peer.ip] = peer
 
     def update_environments(self, environments: List[Dict[str, Any]]) -> None:
         """Aktualizuje listę udostępnionych środowisk"""
@@ -207,6 +285,10 @@ class P2PDiscovery:
         if config.get("p2p.federation.enabled", False):
             features.append("federation")
 
+        # Sprawdź obsługę wiadomości w formacie msgpack
+        if msgpack is not None:
+            features.append("msgpack")
+
         return features
 
     def _listen_for_peers(self) -> None:
@@ -257,17 +339,23 @@ class P2PDiscovery:
                                 )
                                 peer_info.update(peer_data)
                                 self.peers[peer_id] = peer_info
+                                self._index_peer(peer_info)
 
                                 logger.info(
                                     f"Odkryto nowy węzeł: {peer_info.hostname} ({peer_info.ip})"
                                 )
                             else:
                                 # Zaktualizuj istniejący węzeł
-                                self.peers[peer_id].update(peer_data)
+                                peer_info = self.peers[peer_id]
+                                old_hostname, old_ip = peer_info.hostname, peer_info.ip
+                                peer_info.update(peer_data)
+                                self._index_peer(peer_info, old_hostname, old_ip)
                                 logger.debug(
                                     f"Zaktualizowano węzeł: {self.peers[peer_id].hostname} ({self.peers[peer_id].ip})"
                                 )
 
+                            self._peers_version += 1
+
                             # Wywołaj funkcje zwrotne
                             for callback in self.callbacks:
                                 try:
@@ -351,6 +439,9 @@ class P2PDiscovery:
             except Exception as e:
                 logger.error(f"Błąd podczas czyszczenia węzłów: {e}")
 
+        if peers_to_update:
+            self._peers_version += 1
+
         # Wywołaj funkcje zwrotne dla zaktualizowanych węzłów
         for peer_id in peers_to_update:
             for callback in self.callbacks:
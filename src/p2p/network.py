@@ -20,13 +20,14 @@ import uuid
 import zlib
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, AsyncIterable, Callable, Dict, List, Optional, Tuple, Union
 
 import aiohttp
 from aiohttp import web
 
-from ..core.config import config
+from ..core.config import CONFIG_DIR, config
 from .discovery import PeerInfo, discovery
+from .protocol import MSGPACK_CONTENT_TYPE, decode_msgpack, encode_msgpack, msgpack
 
 logger = logging.getLogger("ai-env-manager.p2p.network")
 
@@ -50,6 +51,15 @@ class P2PNetwork:
             "p2p.network.max_message_size", 10 * 1024 * 1024
         )  # 10 MB
         self.timeout = config.get("p2p.network.timeout", 30)  # 30 sekund
+        self.heartbeat_interval = config.get("p2p.network.heartbeat_interval", 10)
+        self.heartbeat_timeout = config.get("p2p.network.heartbeat_timeout", 1)
+        self.heartbeat_task = None
+
+        # Sesja HTTP do komunikacji z innymi węzłami, tworzona przy pierwszym użyciu
+        self.session = None
+
+        # Nazwy i adresy lokalnego hosta, ustalane przy pierwszym użyciu
+        self._local_identifiers = None
 
         # Słownik zarejestrowanych handlerów
         self.handlers = {}
@@ -236,7 +246,10 @@ class P2PNetwork:
                 )
 
             # Odczytaj dane
-            data = await request.json()
+            if request.content_type == MSGPACK_CONTENT_TYPE:
+                data = decode_msgpack(await request.read())
+            else:
+                data = await request.json()
 
             # Sprawdź typ wiadomości
             message_type = data.get("type")
@@ -259,7 +272,13 @@ class P2PNetwork:
             # Wywołaj handler
             result = await handler(data.get("data", {}))
 
-            # Zwróć wynik
+            # Zwróć wynik w formacie akceptowanym przez nadawcę
+            if msgpack is not None and MSGPACK_CONTENT_TYPE in request.headers.get(
+                "Accept", ""
+            ):
+                return web.Response(
+                    body=encode_msgpack(result), content_type=MSGPACK_CONTENT_TYPE
+                )
             return web.json_response(result)
 
         except Exception as e:
@@ -304,7 +323,7 @@ class P2PNetwork:
             file_id = str(uuid.uuid4())
 
             # Utwórz katalog tymczasowy
-            temp_dir = Path(config.get("paths.temp", config.CONFIG_DIR / "temp"))
+            temp_dir = Path(config.get("paths.temp", CONFIG_DIR / "temp"))
             temp_dir.mkdir(parents=True, exist_ok=True)
 
             # Zapisz plik
@@ -339,7 +358,7 @@ class P2PNetwork:
                 )
 
             # Sprawdź czy plik istnieje
-            temp_dir = Path(config.get("paths.temp", config.CONFIG_DIR / "temp"))
+            temp_dir = Path(config.get("paths.temp", CONFIG_DIR / "temp"))
             file_path = temp_dir / file_id
 
             if not file_path.exists():
@@ -378,6 +397,7 @@ class P2PNetwork:
 
         # Uruchom serwer w tle
         self.server_task = asyncio.create_task(self.start_server())
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
 
         # Zarejestruj callback w module discovery
         self.discovery.register_callback(self._on_peer_discovered)
@@ -403,6 +423,14 @@ class P2PNetwork:
             self.server.close()
             await self.server.wait_closed()
 
+        # Anuluj sprawdzanie połączeń
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            try:
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+
         # Anuluj zadanie serwera
         if self.server_task:
             self.server_task.cancel()
@@ -411,9 +439,95 @@ class P2PNetwork:
             except asyncio.CancelledError:
                 pass
 
+        await self.close_session()
+
         logger.info("Zatrzymano sieć P2P")
         return True
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Zwraca sesję HTTP współdzieloną przez wszystkie żądania do innych węzłów.
+
+        Połączenia keep-alive z pulą są ponownie używane, więc kolejne
+        wiadomości do tego samego węzła nie nawiązują nowego połączenia TCP/TLS.
+
+        Returns:
+            aiohttp.ClientSession: Sesja HTTP
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=32,
+                keepalive_timeout=85,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close_session(self) -> None:
+        """Zamyka współdzieloną sesję HTTP, jeśli została utworzona."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_local_identifiers(self) -> frozenset:
+        """
+        Zwraca nazwy i adresy IP, pod którymi widoczny jest lokalny host.
+
+        Zbiór jest budowany raz, dzięki czemu wysyłanie wiadomości nie
+        odpytuje resolvera przy każdym wywołaniu.
+
+        Returns:
+            frozenset: Lokalne identyfikatory
+        """
+        if self._local_identifiers is None:
+            local_hostname = socket.gethostname()
+            identifiers = {"localhost", "127.0.0.1", local_hostname}
+            try:
+                for interface in socket.getaddrinfo(local_hostname, None):
+                    if not interface[4][0].startswith("127."):
+                        identifiers.add(interface[4][0])
+            except OSError:
+                pass
+            self._local_identifiers = frozenset(identifiers)
+        return self._local_identifiers
+
+    async def _heartbeat(self) -> None:
+        """
+        Okresowo sprawdza połączenie ze wszystkimi węzłami.
+
+        Wynik jest zapisywany w module discovery, dzięki czemu rozgłaszanie
+        wiadomości pomija niedostępne węzły zamiast czekać na ich limit czasu.
+        """
+        while self.running:
+            peers = self.discovery.peers_snapshot()
+            results = await asyncio.gather(
+                *(self._ping_peer(peer) for peer in peers),
+                return_exceptions=True,
+            )
+            for peer, result in zip(peers, results):
+                self.discovery.mark_alive(peer["peer_id"], result is True)
+
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _ping_peer(self, peer_info: Dict[str, Any]) -> bool:
+        """
+        Sprawdza, czy węzeł odpowiada na wiadomość ping.
+
+        Nieudane sprawdzenie jest logowane tylko na poziomie DEBUG, ponieważ
+        niedostępny węzeł jest odpytywany przy każdym cyklu heartbeat.
+
+        Args:
+            peer_info: Informacje o węźle
+
+        Returns:
+            bool: True jeśli węzeł odpowiedział, False w przeciwnym razie
+        """
+        result = await self._send_remote(
+            peer_info, "ping", {}, self.heartbeat_timeout, logger.debug
+        )
+        return result is not None
+
     def is_running(self) -> bool:
         """
         Sprawdza czy usługa sieciowa P2P jest uruchomiona.
@@ -442,7 +556,11 @@ class P2PNetwork:
             logger.info(f"Usunięto węzeł: {peer.hostname} ({peer.ip})")
 
     async def send_message(
-        self, peer_id: str, message_type: str, data: Dict[str, Any]
+        self,
+        peer_id: str,
+        message_type: str,
+        data: Dict[str, Any],
+        timeout: Optional[float] = None,
     ) -> Optional[Dict[str, Any]]:
         """
         Wysyła wiadomość do określonego węzła.
@@ -451,36 +569,16 @@ class P2PNetwork:
             peer_id: Identyfikator węzła docelowego
             message_type: Typ wiadomości
             data: Dane wiadomości
+            timeout: Limit czasu w sekundach (domyślnie ``self.timeout``)
 
         Returns:
             Optional[Dict[str, Any]]: Odpowiedź lub None w przypadku błędu
         """
         # Obsługa specjalnych przypadków dla połączeń lokalnych
-        local_identifiers = ["localhost", "127.0.0.1"]
-        local_hostname = socket.gethostname()
-
-        # Pobierz lokalne adresy IP
-        local_ips = []
-        try:
-            for interface in socket.getaddrinfo(local_hostname, None):
-                if interface[4][0] not in local_ips and not interface[4][0].startswith(
-                    "127."
-                ):
-                    local_ips.append(interface[4][0])
-        except:
-            pass
-
-        # Dodaj adres IP z konfiguracji
-        local_ip = config.get("p2p.node.ip")
-        if local_ip and local_ip not in local_ips:
-            local_ips.append(local_ip)
-
-        # Sprawdź, czy peer_id jest lokalnym identyfikatorem
         is_local = (
-            peer_id in local_identifiers
-            or peer_id == local_hostname
-            or peer_id in local_ips
-            or peer_id == self.discovery.peer_id
+            peer_id == self.discovery.peer_id
+            or peer_id == config.get("p2p.node.ip")
+            or peer_id in self._get_local_identifiers()
         )
 
         if is_local:
@@ -508,6 +606,31 @@ class P2PNetwork:
             logger.error(f"Nie znaleziono węzła o ID: {peer_id}")
             return None
 
+        return await self._send_remote(
+            peer_info, message_type, data, timeout, logger.error
+        )
+
+    async def _send_remote(
+        self,
+        peer_info: Dict[str, Any],
+        message_type: str,
+        data: Dict[str, Any],
+        timeout: Optional[float],
+        log: Callable[[str], None],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Wysyła wiadomość do zdalnego węzła.
+
+        Args:
+            peer_info: Informacje o węźle docelowym
+            message_type: Typ wiadomości
+            data: Dane wiadomości
+            timeout: Limit czasu w sekundach (domyślnie ``self.timeout``)
+            log: Funkcja logująca błędy wysyłania
+
+        Returns:
+            Optional[Dict[str, Any]]: Odpowiedź lub None w przypadku błędu
+        """
         # Przygotuj wiadomość
         message = {
             "type": message_type,
@@ -516,38 +639,51 @@ class P2PNetwork:
             "timestamp": datetime.now().isoformat(),
         }
 
+        # Węzły obsługujące msgpack dostają wiadomość w tym formacie,
+        # pozostałe w JSON
+        if msgpack is not None and "msgpack" in peer_info.get("features", ()):
+            body = {
+                "data": encode_msgpack(message),
+                "headers": {
+                    "Content-Type": MSGPACK_CONTENT_TYPE,
+                    "Accept": MSGPACK_CONTENT_TYPE,
+                },
+            }
+        else:
+            body = {"json": message}
+
         # Wyślij wiadomość
         try:
-            # Utwórz sesję HTTP
-            async with aiohttp.ClientSession() as session:
-                # Określ protokół (HTTP lub HTTPS)
-                protocol = "https" if self.use_ssl else "http"
-                url = f"{protocol}://{peer_info['ip']}:{self.port}/message"
-
-                # Wyślij żądanie POST
-                async with session.post(
-                    url,
-                    json=message,
-                    ssl=(
-                        False if self.use_ssl else None
-                    ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
-                    timeout=self.timeout,
-                ) as response:
-                    # Sprawdź status odpowiedzi
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(
-                            f"Błąd podczas wysyłania wiadomości: {response.status} - {error_text}"
-                        )
-                        return None
-
-                    # Zwróć odpowiedź
-                    return await response.json()
+            # Współdzielona sesja HTTP z pulą połączeń
+            session = self._get_session()
+            # Określ protokół (HTTP lub HTTPS)
+            protocol = "https" if self.use_ssl else "http"
+            url = f"{protocol}://{peer_info['ip']}:{self.port}/message"
+
+            # Wyślij żądanie POST
+            async with session.post(
+                url,
+                ssl=(
+                    False if self.use_ssl else None
+                ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
+                timeout=self.timeout if timeout is None else timeout,
+                **body,
+            ) as response:
+                # Sprawdź status odpowiedzi
+                if response.status != 200:
+                    error_text = await response.text()
+                    log(
+                        f"Błąd podczas wysyłania wiadomości: {response.status} - {error_text}"
+                    )
+                    return None
+
+                # Zwróć odpowiedź
+                if response.content_type == MSGPACK_CONTENT_TYPE:
+                    return decode_msgpack(await response.read())
+                return await response.json()
 
         except Exception as e:
-            logger.error(
-                f"Błąd podczas wysyłania wiadomości do {peer_info['hostname']}: {e}"
-            )
+            log(f"Błąd podczas wysyłania wiadomości do {peer_info['hostname']}: {e}")
             return None
 
     async def upload_file(
@@ -583,36 +719,96 @@ class P2PNetwork:
 
         # Wyślij plik
         try:
-            # Utwórz sesję HTTP
-            async with aiohttp.ClientSession() as session:
-                # Określ protokół (HTTP lub HTTPS)
-                protocol = "https" if self.use_ssl else "http"
-                url = f"{protocol}://{peer_info['ip']}:{self.port}/file/upload"
-
-                # Przygotuj dane multipart
-                data = aiohttp.FormData()
-                data.add_field("metadata", json.dumps(metadata))
-                data.add_field("file", open(file_path, "rb"), filename=file_path.name)
-
-                # Wyślij żądanie POST
-                async with session.post(
-                    url,
-                    data=data,
-                    ssl=(
-                        False if self.use_ssl else None
-                    ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
-                    timeout=self.timeout,
-                ) as response:
-                    # Sprawdź status odpowiedzi
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(
-                            f"Błąd podczas przesyłania pliku: {response.status} - {error_text}"
-                        )
-                        return None
-
-                    # Zwróć odpowiedź
-                    return await response.json()
+            # Współdzielona sesja HTTP z pulą połączeń
+            session = self._get_session()
+            # Określ protokół (HTTP lub HTTPS)
+            protocol = "https" if self.use_ssl else "http"
+            url = f"{protocol}://{peer_info['ip']}:{self.port}/file/upload"
+
+            # Przygotuj dane multipart
+            data = aiohttp.FormData()
+            data.add_field("metadata", json.dumps(metadata))
+            data.add_field("file", open(file_path, "rb"), filename=file_path.name)
+
+            # Wyślij żądanie POST
+            async with session.post(
+                url,
+                data=data,
+                ssl=(
+                    False if self.use_ssl else None
+                ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
+                timeout=self.timeout,
+            ) as response:
+                # Sprawdź status odpowiedzi
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(
+                        f"Błąd podczas przesyłania pliku: {response.status} - {error_text}"
+                    )
+                    return None
+
+                # Zwróć odpowiedź
+                return await response.json()
+
+        except Exception as e:
+            logger.error(
+                f"Błąd podczas przesyłania pliku do {peer_info['hostname']}: {e}"
+            )
+            return None
+
+    async def upload_file_stream(
+        self,
+        peer_id: str,
+        chunks: AsyncIterable[bytes],
+        filename: str,
+        metadata: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Przesyła plik do określonego węzła strumieniowo, fragment po fragmencie.
+
+        Treść nie jest buforowana w pamięci, a żądanie jest wysyłane w trybie
+        chunked, więc rozmiar pliku nie musi być znany z góry.
+
+        Args:
+            peer_id: Identyfikator węzła docelowego
+            chunks: Asynchroniczne źródło kolejnych fragmentów pliku
+            filename: Nazwa pliku przekazywana w danych multipart
+            metadata: Metadane pliku
+
+        Returns:
+            Optional[Dict[str, Any]]: Informacje o przesłanym pliku lub None w przypadku błędu
+        """
+        # Pobierz informacje o węźle
+        peer_info = self.discovery.get_peer(peer_id)
+        if not peer_info:
+            logger.error(f"Nie znaleziono węzła o ID: {peer_id}")
+            return None
+
+        try:
+            session = self._get_session()
+            protocol = "https" if self.use_ssl else "http"
+            url = f"{protocol}://{peer_info['ip']}:{self.port}/file/upload"
+
+            data = aiohttp.FormData()
+            data.add_field("metadata", json.dumps(metadata))
+            data.add_field("file", chunks, filename=filename)
+
+            async with session.post(
+                url,
+                data=data,
+                ssl=(
+                    False if self.use_ssl else None
+                ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
+                timeout=self.timeout,
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(
+                        f"Błąd podczas przesyłania pliku: {response.status} - {error_text}"
+                    )
+                    return None
+
+                return await response.json()
 
         except Exception as e:
             logger.error(
@@ -642,38 +838,38 @@ class P2PNetwork:
 
         # Pobierz plik
         try:
-            # Utwórz sesję HTTP
-            async with aiohttp.ClientSession() as session:
-                # Określ protokół (HTTP lub HTTPS)
-                protocol = "https" if self.use_ssl else "http"
-                url = f"{protocol}://{peer_info['ip']}:{self.port}/file/download/{file_id}"
-
-                # Wyślij żądanie GET
-                async with session.get(
-                    url,
-                    ssl=(
-                        False if self.use_ssl else None
-                    ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
-                    timeout=self.timeout,
-                ) as response:
-                    # Sprawdź status odpowiedzi
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(
-                            f"Błąd podczas pobierania pliku: {response.status} - {error_text}"
-                        )
-                        return False
-
-                    # Zapisz plik
-                    with open(output_path, "wb") as f:
-                        while True:
-                            chunk = await response.content.read(8192)
-                            if not chunk:
-                                break
-                            f.write(chunk)
-
-                    logger.info(f"Pobrano plik {file_id} do {output_path}")
-                    return True
+            # Współdzielona sesja HTTP z pulą połączeń
+            session = self._get_session()
+            # Określ protokół (HTTP lub HTTPS)
+            protocol = "https" if self.use_ssl else "http"
+            url = f"{protocol}://{peer_info['ip']}:{self.port}/file/download/{file_id}"
+
+            # Wyślij żądanie GET
+            async with session.get(
+                url,
+                ssl=(
+                    False if self.use_ssl else None
+                ),  # Ignoruj błędy SSL dla samopodpisanych certyfikatów
+                timeout=self.timeout,
+            ) as response:
+                # Sprawdź status odpowiedzi
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(
+                        f"Błąd podczas pobierania pliku: {response.status} - {error_text}"
+                    )
+                    return False
+
+                # Zapisz plik
+                with open(output_path, "wb") as f:
+                    while True:
+                        chunk = await response.content.read(65536)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+
+                logger.info(f"Pobrano plik {file_id} do {output_path}")
+                return True
 
         except Exception as e:
             logger.error(
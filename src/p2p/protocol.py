@@ -16,6 +16,25 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 
 logger = logging.getLogger("ai-env-manager.p2p.protocol")
 
+# Kodowanie msgpack jest używane tylko wtedy, gdy moduł jest zainstalowany
+# i węzeł docelowy ogłasza jego obsługę (funkcja "msgpack" w discovery)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+def encode_msgpack(data: Any) -> bytes:
+    """Koduje dane wiadomości w formacie msgpack"""
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def decode_msgpack(body: bytes) -> Any:
+    """Dekoduje dane wiadomości zapisane w formacie msgpack"""
+    return msgpack.unpackb(body, raw=False)
+
 
 class MessageType(Enum):
     """Typy wiadomości protokołu P2P"""
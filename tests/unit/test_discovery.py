@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the P2P discovery module
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime
+
+# Add the project root directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.p2p.discovery import P2PDiscovery, PeerInfo
+
+
+class TestGetPeers(unittest.TestCase):
+    """Test cases for P2PDiscovery.get_peers."""
+
+    def setUp(self):
+        self.discovery = P2PDiscovery()
+        peer = PeerInfo("a", "host-a", "127.0.0.2", datetime.now().isoformat())
+        self.discovery.peers["a"] = peer
+        self.discovery._index_peer(peer)
+
+    def test_get_peers_returns_copies(self):
+        """Test that modifying returned peers does not change the snapshot."""
+        peers = self.discovery.get_peers()
+        peers[0]["hostname"] = "changed"
+        peers.append({"peer_id": "b"})
+
+        self.assertEqual(len(self.discovery.get_peers()), 1)
+        self.assertEqual(self.discovery.get_peers()[0]["hostname"], "host-a")
+        self.assertEqual(self.discovery.peers_snapshot()[0]["hostname"], "host-a")
+
+
+class TestPeerIndexes(unittest.TestCase):
+    """Test cases for looking up peers by hostname and IP address."""
+
+    def setUp(self):
+        self.discovery = P2PDiscovery()
+        self.peer = PeerInfo("a", "host-a", "127.0.0.2", datetime.now().isoformat())
+        self.discovery.peers["a"] = self.peer
+        self.discovery._index_peer(self.peer)
+
+    def test_get_peer_by_id_hostname_and_ip(self):
+        """Test that get_peer finds a peer by any of its identifiers."""
+        for key in ("a", "host-a", "127.0.0.2"):
+            with self.subTest(key=key):
+                self.assertEqual(self.discovery.get_peer(key)["peer_id"], "a")
+        self.assertIsNone(self.discovery.get_peer("host-b"))
+
+    def test_changed_hostname_and_ip_replace_old_entries(self):
+        """Test that an updated peer is no longer found by its old hostname or IP."""
+        old_hostname, old_ip = self.peer.hostname, self.peer.ip
+        self.peer.update({"hostname": "host-a2", "ip": "127.0.0.3"})
+        self.discovery._index_peer(self.peer, old_hostname, old_ip)
+
+        self.assertEqual(self.discovery.get_peer("host-a2")["peer_id"], "a")
+        self.assertEqual(self.discovery.get_peer("127.0.0.3")["peer_id"], "a")
+        self.assertIsNone(self.discovery.get_peer("host-a"))
+        self.assertIsNone(self.discovery.get_peer("127.0.0.2"))
+
+    def test_old_entry_taken_over_by_another_peer_is_kept(self):
+        """Test that moving a peer does not drop an entry now owned by another peer."""
+        other = PeerInfo("b", "host-a", "127.0.0.2", datetime.now().isoformat())
+        self.discovery.peers["b"] = other
+        self.discovery._index_peer(other)
+
+        self.peer.update({"hostname": "host-a2", "ip": "127.0.0.3"})
+        self.discovery._index_peer(self.peer, "host-a", "127.0.0.2")
+
+        self.assertEqual(self.discovery.get_peer("host-a")["peer_id"], "b")
+        self.assertEqual(self.discovery.get_peer("127.0.0.2")["peer_id"], "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
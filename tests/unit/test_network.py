@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the P2P network module
+"""
+
+import os
+import socket
+import sys
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add the project root directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.p2p import network as network_module
+from src.p2p import protocol
+from src.p2p.discovery import P2PDiscovery, PeerInfo
+from src.p2p.network import P2PNetwork
+
+
+def _free_port():
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _add_peer(discovery, peer_id, ip="127.0.0.2", features=()):
+    """Register a peer in the discovery module as if it had been discovered."""
+    peer = PeerInfo(peer_id, f"host-{peer_id}", ip, datetime.now().isoformat())
+    peer.features = list(features)
+    discovery.peers[peer_id] = peer
+    discovery._index_peer(peer)
+    return peer
+
+
+class TestHeartbeat(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the heartbeat loop."""
+
+    async def asyncSetUp(self):
+        self.network = P2PNetwork()
+        self.network.use_ssl = False
+        self.network.heartbeat_interval = 0
+        self.network.discovery = P2PDiscovery()
+        for peer_id in ("a", "b", "c"):
+            _add_peer(self.network.discovery, peer_id)
+
+    async def asyncTearDown(self):
+        await self.network.close_session()
+
+    async def _run_heartbeat(self, results):
+        """Run one heartbeat cycle with the given ping results."""
+
+        async def ping(peer_info):
+            # Stop the loop after this cycle
+            self.network.running = False
+            result = results[peer_info["peer_id"]]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        self.network.running = True
+        with mock.patch.object(self.network, "_ping_peer", side_effect=ping):
+            await self.network._heartbeat()
+
+    def _alive_ids(self):
+        return {peer["peer_id"] for peer in self.network.discovery.alive_peers()}
+
+    async def test_unchecked_peers_are_alive(self):
+        """Test that peers are considered alive before the first heartbeat."""
+        self.assertEqual(self._alive_ids(), {"a", "b", "c"})
+
+    async def test_alive_peers_follow_ping_results(self):
+        """Test that mark_alive/alive_peers follow the ping results."""
+        await self._run_heartbeat({"a": True, "b": False, "c": OSError("boom")})
+        self.assertEqual(self._alive_ids(), {"a"})
+
+        await self._run_heartbeat({"a": False, "b": True, "c": True})
+        self.assertEqual(self._alive_ids(), {"b", "c"})
+
+    async def test_failed_ping_is_logged_at_debug_level(self):
+        """Test that an unreachable peer does not produce error logs."""
+        self.network.port = _free_port()
+        peer = self.network.discovery.get_peer("a")
+        peer["ip"] = "127.0.0.1"
+        with self.assertLogs(network_module.logger, level="DEBUG") as logs:
+            self.assertFalse(await self.network._ping_peer(peer))
+        self.assertEqual({record.levelname for record in logs.records}, {"DEBUG"})
+
+
+class TestMsgpackProtocol(unittest.TestCase):
+    """Test cases for the msgpack helpers."""
+
+    @unittest.skipIf(protocol.msgpack is None, "msgpack is not installed")
+    def test_round_trip(self):
+        """Test that encoded messages decode to the same data."""
+        message = {
+            "type": "echo",
+            "data": {"items": [1, 2.5, "x", None], "raw": b"\x00\xff"},
+        }
+        self.assertEqual(
+            protocol.decode_msgpack(protocol.encode_msgpack(message)), message
+        )
+
+
+class TestMessageEncoding(unittest.IsolatedAsyncioTestCase):
+    """Test cases for msgpack negotiation in send_message."""
+
+    async def asyncSetUp(self):
+        self.requests = []
+
+        @web.middleware
+        async def record(request, handler):
+            response = await handler(request)
+            self.requests.append((request.content_type, response.content_type))
+            return response
+
+        receiver = P2PNetwork()
+        receiver.register_handler("echo", self._echo)
+        app = web.Application(middlewares=[record])
+        app.router.add_post("/message", receiver._handle_message)
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+        self.network = P2PNetwork()
+        self.network.use_ssl = False
+        self.network.port = self.server.port
+        self.network.discovery = P2PDiscovery()
+        _add_peer(self.network.discovery, "plain", ip="127.0.0.1")
+        _add_peer(
+            self.network.discovery, "packed", ip="127.0.0.1", features=["msgpack"]
+        )
+
+    async def asyncTearDown(self):
+        await self.network.close_session()
+        await self.server.close()
+
+    async def _echo(self, data):
+        return {"status": "ok", "echo": data}
+
+    async def _send(self, peer_id):
+        data = {"name": "vm-1", "tags": ["a", "b"], "size": 2.5}
+        result = await self.network.send_message(peer_id, "echo", data)
+        self.assertEqual(result, {"status": "ok", "echo": data})
+
+    @unittest.skipIf(protocol.msgpack is None, "msgpack is not installed")
+    async def test_peer_with_msgpack_feature_uses_msgpack(self):
+        """Test that peers advertising msgpack get msgpack both ways."""
+        await self._send("packed")
+        self.assertEqual(
+            self.requests,
+            [(protocol.MSGPACK_CONTENT_TYPE, protocol.MSGPACK_CONTENT_TYPE)],
+        )
+
+    async def test_peer_without_msgpack_feature_uses_json(self):
+        """Test that peers not advertising msgpack get JSON."""
+        await self._send("plain")
+        self.assertEqual(self.requests, [("application/json", "application/json")])
+
+    async def test_missing_msgpack_falls_back_to_json(self):
+        """Test that JSON is used when msgpack is not installed."""
+        with mock.patch.object(network_module, "msgpack", None):
+            await self._send("packed")
+        self.assertEqual(self.requests, [("application/json", "application/json")])
+
+
+if __name__ == "__main__":
+    unittest.main()
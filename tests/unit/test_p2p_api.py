@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the P2P API
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add the project root directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.api import p2p_api
+from src.api.p2p_api import P2PAPI
+from src.core.config import config
+from src.p2p import network as network_module
+from src.p2p.discovery import P2PDiscovery, PeerInfo
+from src.p2p.network import P2PNetwork, network
+
+
+def _discovery_with_peers(*peer_ids):
+    """Return a discovery instance that already knows the given peers."""
+    discovery = P2PDiscovery()
+    for peer_id in peer_ids:
+        peer = PeerInfo(
+            peer_id, f"host-{peer_id}", "127.0.0.1", datetime.now().isoformat()
+        )
+        discovery.peers[peer_id] = peer
+        discovery._index_peer(peer)
+    return discovery
+
+
+class TestBroadcastMessage(unittest.IsolatedAsyncioTestCase):
+    """Test cases for P2PAPI.broadcast_message."""
+
+    async def asyncSetUp(self):
+        self.discovery = _discovery_with_peers("a", "b", "c", "dead")
+        self.discovery.mark_alive("dead", False)
+        patch = mock.patch.object(p2p_api, "discovery", self.discovery)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.api = P2PAPI()
+        self.active = 0
+        self.max_active = 0
+
+    async def _send_message(self, peer_id, message_type, data):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            # Give the other sends a chance to start before this one finishes
+            await asyncio.sleep(0.01)
+            if peer_id == "b":
+                raise OSError("connection refused")
+            return {"status": "ok", "peer": peer_id, "type": message_type}
+        finally:
+            self.active -= 1
+
+    async def test_sends_to_alive_peers_concurrently(self):
+        """Test that messages go out at once and failures become error entries."""
+        with mock.patch.object(network, "send_message", self._send_message):
+            responses = await self.api.broadcast_message("hello", {})
+
+        self.assertEqual(self.max_active, 3)
+        self.assertEqual(
+            responses,
+            {
+                "a": {"status": "ok", "peer": "a", "type": "hello"},
+                "b": {"error": "connection refused"},
+                "c": {"status": "ok", "peer": "c", "type": "hello"},
+            },
+        )
+
+    async def test_concurrent_sends_are_limited(self):
+        """Test that no more than MAX_CONCURRENT_SENDS messages are in flight."""
+        with mock.patch.object(p2p_api, "MAX_CONCURRENT_SENDS", 2):
+            with mock.patch.object(network, "send_message", self._send_message):
+                responses = await self.api.broadcast_message("hello", {})
+
+        self.assertEqual(self.max_active, 2)
+        self.assertEqual(set(responses), {"a", "b", "c"})
+
+
+class TestGetPeerInfo(unittest.TestCase):
+    """Test cases for P2PAPI.get_peer_info."""
+
+    def setUp(self):
+        self.discovery = _discovery_with_peers("a", "b")
+        self.discovery.peers["b"].status = "inactive"
+        patch = mock.patch.object(p2p_api, "discovery", self.discovery)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.api = P2PAPI()
+
+    def test_looks_up_peer_without_listing_peers(self):
+        """Test that a peer is found by id without building the peer list."""
+        with mock.patch.object(self.discovery, "get_peers") as get_peers:
+            info = self.api.get_peer_info("a")
+
+        get_peers.assert_not_called()
+        self.assertEqual(info["peer_id"], "a")
+        self.assertEqual(info["hostname"], "host-a")
+
+    def test_unknown_and_inactive_peers_are_not_found(self):
+        """Test that only active peers are returned."""
+        self.assertIsNone(self.api.get_peer_info("missing"))
+        self.assertIsNone(self.api.get_peer_info("b"))
+
+
+class TestFileTransfer(unittest.IsolatedAsyncioTestCase):
+    """Test cases for sending and requesting files through the P2P API."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp.name)
+        self.remote_dir = self.tmp_path / "remote"
+        config_get = config.get
+
+        def get(key, default=None):
+            if key == "paths.temp":
+                return str(self.remote_dir)
+            return config_get(key, default)
+
+        self.config_patch = mock.patch.object(network_module.config, "get", get)
+        self.config_patch.start()
+
+        receiver = P2PNetwork()
+        self.upload = mock.AsyncMock(side_effect=receiver._handle_file_upload)
+        self.download = mock.AsyncMock(side_effect=receiver._handle_file_download)
+        app = web.Application()
+        app.router.add_post("/file/upload", self.upload)
+        app.router.add_get("/file/download/{file_id}", self.download)
+        self.server = TestServer(app, host="127.0.0.1")
+        await self.server.start_server()
+
+        discovery = P2PDiscovery()
+        peer = PeerInfo("peer", "peer-host", "127.0.0.1", datetime.now().isoformat())
+        discovery.peers["peer"] = peer
+        discovery._index_peer(peer)
+        for name, value in (
+            ("discovery", discovery),
+            ("use_ssl", False),
+            ("port", self.server.port),
+            ("session", None),
+        ):
+            patch = mock.patch.object(network, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.api = P2PAPI()
+
+    async def asyncTearDown(self):
+        await network.close_session()
+        await self.server.close()
+        self.config_patch.stop()
+        self.tmp.cleanup()
+
+    async def test_send_file_streams_the_upload(self):
+        """Test that send_file uploads through the streaming path."""
+        source = self.tmp_path / "source.bin"
+        source.write_bytes(os.urandom(300_000))
+
+        with mock.patch.object(
+            network, "upload_file_stream", wraps=network.upload_file_stream
+        ) as upload_file_stream:
+            result = await self.api.send_file("peer", str(source))
+
+        upload_file_stream.assert_awaited_once()
+        self.assertEqual(result["status"], "ok")
+        stored = self.remote_dir / result["file_id"]
+        self.assertEqual(stored.read_bytes(), source.read_bytes())
+
+    async def test_request_file_downloads_to_local_path(self):
+        """Test that request_file writes the remote file to local_path."""
+        self.remote_dir.mkdir()
+        content = os.urandom(300_000)
+        (self.remote_dir / "file-1").write_bytes(content)
+        local_path = self.tmp_path / "downloaded.bin"
+
+        result = await self.api.request_file("peer", "file-1", str(local_path))
+
+        self.assertEqual(result, {"status": "ok", "local_path": str(local_path)})
+        self.assertEqual(local_path.read_bytes(), content)
+
+    async def test_request_file_missing_returns_none(self):
+        """Test that a failed download returns None and writes nothing."""
+        self.remote_dir.mkdir()
+        local_path = self.tmp_path / "missing.bin"
+
+        result = await self.api.request_file("peer", "missing", str(local_path))
+
+        self.assertIsNone(result)
+        self.assertFalse(local_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the REST API client
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add the project root directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.api.rest_client import HTTPError, RESTClient
+
+# Error page returned by a reverse proxy in front of the API
+PROXY_ERROR_PAGE = "<html><body>" + "Bad Gateway " * 50 + "</body></html>"
+
+
+class FakeAPI:
+    """Minimal REST API server counting the requests it receives."""
+
+    def __init__(self):
+        self.vms = []
+        self.hits = {"list_vms": 0, "get_peers": 0}
+        self.bodies = []
+        # Set to make GET /api/vm wait until it is released
+        self.list_gate = None
+        self.list_started = asyncio.Event()
+        # Requests to remote endpoints currently being handled, and the maximum
+        self.active = 0
+        self.max_active = 0
+        # Seconds GET /api/vm/{name} waits before answering, per VM name
+        self.status_delays = {}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/api/vm", self.list_vms)
+        app.router.add_post("/api/vm", self.create_vm)
+        app.router.add_get("/api/vm/{name}", self.get_vm_status)
+        app.router.add_delete("/api/vm/{name}", self.delete_vm)
+        app.router.add_get("/api/p2p/peers", self.get_peers)
+        app.router.add_post("/api/p2p/message", self.send_message)
+        app.router.add_get("/api/proxy-error", self.proxy_error)
+        app.router.add_get("/api/empty-error", self.empty_error)
+        app.router.add_get("/api/remote/{peer_id}/vm", self.list_remote_vms)
+        app.router.add_post(
+            "/api/remote/{peer_id}/vm/{vm_id}/start", self.remote_action
+        )
+        app.router.add_post("/api/remote/{peer_id}/vm/{vm_id}/stop", self.remote_action)
+        app.router.add_delete("/api/remote/{peer_id}/vm/{vm_id}", self.remote_action)
+        return app
+
+    async def _remote_call(self, request):
+        """Simulate a slow remote peer; the peer "bad" answers with an error."""
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.active -= 1
+        if request.match_info["peer_id"] == "bad":
+            raise web.HTTPInternalServerError(
+                text='{"error": "peer unreachable"}', content_type="application/json"
+            )
+
+    async def list_remote_vms(self, request):
+        await self._remote_call(request)
+        peer_id = request.match_info["peer_id"]
+        return web.json_response({"vms": [{"name": f"vm-{peer_id}"}]})
+
+    async def remote_action(self, request):
+        await self._remote_call(request)
+        body = await request.json() if request.can_read_body else None
+        action = request.path.rsplit("/", 1)[-1]
+        if request.method == "DELETE":
+            action = "delete"
+        return web.json_response(
+            {"action": action, "vm_id": request.match_info["vm_id"], "body": body}
+        )
+
+    async def list_vms(self, request):
+        self.hits["list_vms"] += 1
+        vms = [dict(vm) for vm in self.vms]
+        if self.list_gate is not None:
+            self.list_started.set()
+            await self.list_gate.wait()
+        return web.json_response({"vms": vms})
+
+    async def get_vm_status(self, request):
+        name = request.match_info["name"]
+        await asyncio.sleep(self.status_delays.get(name, 0))
+        if name == "missing":
+            raise web.HTTPNotFound(
+                text='{"error": "VM not found"}', content_type="application/json"
+            )
+        return web.json_response({"name": name, "state": "running"})
+
+    async def create_vm(self, request):
+        data = await request.json()
+        self.bodies.append((request.content_type, data))
+        self.vms.append({"name": data["name"]})
+        return web.json_response({"success": True})
+
+    async def delete_vm(self, request):
+        name = request.match_info["name"]
+        self.vms = [vm for vm in self.vms if vm["name"] != name]
+        return web.json_response({"success": True})
+
+    async def send_message(self, request):
+        self.bodies.append((request.content_type, await request.json()))
+        return web.json_response({"status": "ok"})
+
+    async def proxy_error(self, request):
+        raise web.HTTPBadGateway(text=PROXY_ERROR_PAGE, content_type="text/html")
+
+    async def empty_error(self, request):
+        raise web.HTTPServiceUnavailable(text="")
+
+    async def get_peers(self, request):
+        self.hits["get_peers"] += 1
+        return web.json_response({"peers": [{"peer_id": "a"}]})
+
+
+class _FakeAPITestCase(unittest.IsolatedAsyncioTestCase):
+    """Base class running a RESTClient against FakeAPI."""
+
+    async def asyncSetUp(self):
+        self.api = FakeAPI()
+        self.server = TestServer(self.api.app(), host="127.0.0.1")
+        await self.server.start_server()
+        self.client = RESTClient(str(self.server.make_url("")))
+        await self.client.__aenter__()
+
+    async def asyncTearDown(self):
+        await self.client.__aexit__(None, None, None)
+        await self.server.close()
+
+
+class TestRequestBodies(_FakeAPITestCase):
+    """Test cases for the JSON request bodies sent by RESTClient."""
+
+    async def test_dataclass_body_is_sent_as_json(self):
+        """Test that create_vm sends its dataclass as a JSON object."""
+        await self.client.create_vm("vm-1", "ubuntu", cpu_cores=4)
+        content_type, body = self.api.bodies[0]
+        self.assertEqual(content_type, "application/json")
+        self.assertEqual(body["name"], "vm-1")
+        self.assertEqual(body["cpu_cores"], 4)
+
+    async def test_non_string_keys_are_accepted(self):
+        """Test that dict keys which are not strings are sent like json.dumps does."""
+        await self.client.send_message("peer", "stats", {1: "one", 2.5: True})
+        self.assertEqual(self.api.bodies[0][1]["data"], {"1": "one", "2.5": True})
+
+
+class TestHTTPErrors(_FakeAPITestCase):
+    """Test cases for the HTTPError raised on error responses."""
+
+    async def test_json_error_uses_error_field(self):
+        """Test that the "error" field of a JSON body becomes the message."""
+        with self.assertRaises(HTTPError) as cm:
+            await self.client.get_vm_status("missing")
+
+        self.assertIsInstance(cm.exception, Exception)
+        self.assertEqual(cm.exception.status, 404)
+        self.assertEqual(cm.exception.message, "VM not found")
+        self.assertEqual(str(cm.exception), "HTTP Error 404: VM not found")
+
+    async def test_non_json_error_is_truncated(self):
+        """Test that a non-JSON error page is reported by its first 256 bytes."""
+        with self.assertRaises(HTTPError) as cm:
+            await self.client._get("/api/proxy-error")
+
+        self.assertEqual(cm.exception.status, 502)
+        self.assertEqual(cm.exception.message, PROXY_ERROR_PAGE[:256])
+
+    async def test_empty_error_body(self):
+        """Test that an error without a body still has a message."""
+        with self.assertRaises(HTTPError) as cm:
+            await self.client._get("/api/empty-error")
+
+        self.assertEqual(cm.exception.status, 503)
+        self.assertEqual(cm.exception.message, "Unknown error")
+
+
+class TestBulkRemoteOperations(_FakeAPITestCase):
+    """Test cases for the *_many remote VM helpers."""
+
+    async def test_list_remote_vms_many(self):
+        """Test that peers are queried concurrently and errors are reported per peer."""
+        result = await self.client.list_remote_vms_many(["p1", "p2", "bad"])
+
+        self.assertEqual(self.api.max_active, 3)
+        self.assertEqual(
+            result,
+            {
+                "p1": [{"name": "vm-p1"}],
+                "p2": [{"name": "vm-p2"}],
+                "bad": {"error": "HTTP Error 500: peer unreachable"},
+            },
+        )
+
+    async def test_start_remote_vms_many_respects_max_concurrency(self):
+        """Test that no more than max_concurrency requests are in flight."""
+        targets = [("p1", "a"), ("p1", "b"), ("p2", "a"), ("p2", "b")]
+        result = await self.client.start_remote_vms_many(targets, max_concurrency=2)
+
+        self.assertEqual(self.api.max_active, 2)
+        self.assertEqual(set(result), set(targets))
+        self.assertEqual(result[("p2", "b")]["action"], "start")
+
+    async def test_stop_and_delete_pass_their_flags(self):
+        """Test that force and delete_disk reach every request."""
+        stopped = await self.client.stop_remote_vms_many([("p1", "a")], force=True)
+        deleted = await self.client.delete_remote_vms_many(
+            [("p1", "a")], delete_disk=False
+        )
+
+        self.assertEqual(stopped[("p1", "a")]["body"], {"force": True})
+        self.assertEqual(deleted[("p1", "a")]["action"], "delete")
+        self.assertEqual(deleted[("p1", "a")]["body"], {"delete_disk": False})
+
+
+class TestVMStatuses(_FakeAPITestCase):
+    """Test cases for RESTClient.get_vm_statuses."""
+
+    async def test_results_arrive_in_completion_order(self):
+        """Test that a slow VM does not hold back the others and errors are reported."""
+        self.api.status_delays = {"slow": 0.2}
+        results = [
+            item
+            async for item in self.client.get_vm_statuses(["slow", "missing", "fast"])
+        ]
+
+        self.assertEqual(results[-1], ("slow", {"name": "slow", "state": "running"}))
+        self.assertEqual(
+            dict(results[:2]),
+            {
+                "missing": {"error": "HTTP Error 404: VM not found"},
+                "fast": {"name": "fast", "state": "running"},
+            },
+        )
+
+    async def test_stopping_iteration_cancels_pending_requests(self):
+        """Test that breaking out of the loop cancels the requests still running."""
+        cancelled = []
+
+        async def get_vm_status(name):
+            if name == "fast":
+                return {"name": name}
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+
+        self.client.get_vm_status = get_vm_status
+        statuses = self.client.get_vm_statuses(["hang-1", "fast", "hang-2"])
+        async for name, _ in statuses:
+            self.assertEqual(name, "fast")
+            break
+        await statuses.aclose()
+        await asyncio.sleep(0)
+
+        self.assertEqual(sorted(cancelled), ["hang-1", "hang-2"])
+
+
+class TestResponseCache(_FakeAPITestCase):
+    """Test cases for the RESTClient response cache."""
+
+    async def test_repeated_reads_are_cached(self):
+        """Test that repeated list_vms calls within the TTL hit the server once."""
+        await self.client.list_vms()
+        await self.client.list_vms()
+        self.assertEqual(self.api.hits["list_vms"], 1)
+
+    async def test_cached_value_is_a_copy(self):
+        """Test that modifying a returned list does not change the cache."""
+        self.api.vms = [{"name": "vm-1"}]
+        (await self.client.list_vms()).append({"name": "bogus"})
+        self.assertEqual(await self.client.list_vms(), [{"name": "vm-1"}])
+
+    async def test_create_invalidates_list_vms(self):
+        """Test that create_vm invalidates a cached list_vms."""
+        self.assertEqual(await self.client.list_vms(), [])
+        await self.client.create_vm("vm-1", "ubuntu")
+        self.assertEqual(await self.client.list_vms(), [{"name": "vm-1"}])
+        self.assertEqual(self.api.hits["list_vms"], 2)
+
+    async def test_delete_invalidates_list_vms(self):
+        """Test that delete_vm invalidates a cached list_vms."""
+        self.api.vms = [{"name": "vm-1"}]
+        self.assertEqual(await self.client.list_vms(), [{"name": "vm-1"}])
+        await self.client.delete_vm("vm-1")
+        self.assertEqual(await self.client.list_vms(), [])
+
+    async def test_writes_keep_peer_cache(self):
+        """Test that VM writes do not invalidate unrelated cached reads."""
+        await self.client.get_peers()
+        await self.client.create_vm("vm-1", "ubuntu")
+        await self.client.get_peers()
+        self.assertEqual(self.api.hits["get_peers"], 1)
+
+    async def test_read_overlapping_a_write_is_not_cached(self):
+        """Test that a read started before a write does not cache stale data."""
+        self.api.list_gate = asyncio.Event()
+        stale_read = asyncio.ensure_future(self.client.list_vms())
+        await self.api.list_started.wait()
+
+        await self.client.create_vm("vm-1", "ubuntu")
+        self.api.list_gate.set()
+        self.assertEqual(await stale_read, [])
+
+        self.api.list_gate = None
+        self.assertEqual(await self.client.list_vms(), [{"name": "vm-1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the REST API server
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import urllib.request
+from unittest import mock
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+# Add the project root directory to the path so we can import modules
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.insert(0, ROOT_DIR)
+
+from src.api import rest_server
+
+
+def _free_port():
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=10.0):
+    """Wait until something accepts connections on the given port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def _child_pids(pid):
+    """Return the PIDs of the direct children of a process (Linux only)."""
+    path = f"/proc/{pid}/task/{pid}/children"
+    with open(path) as f:
+        return [int(child) for child in f.read().split()]
+
+
+class _Unserializable:
+    """Object that neither json nor orjson can serialize."""
+
+
+class TestJsonListResponse(unittest.IsolatedAsyncioTestCase):
+    """Test cases for json_list_response."""
+
+    async def asyncSetUp(self):
+        self.items = []
+
+        async def handler(request):
+            return await rest_server.json_list_response(request, "items", self.items)
+
+        app = web.Application()
+        app.router.add_get("/items", handler)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_short_list_is_sent_in_one_response(self):
+        """Test that short lists are sent with a Content-Length."""
+        self.items = [{"id": i} for i in range(3)]
+        response = await self.client.get("/items")
+        self.assertEqual(response.status, 200)
+        self.assertIsNotNone(response.content_length)
+        self.assertEqual(await response.json(), {"items": self.items})
+
+    async def test_long_list_is_streamed_as_valid_json(self):
+        """Test that lists above the threshold are streamed as valid JSON."""
+        count = rest_server.STREAM_LIST_THRESHOLD + rest_server.STREAM_LIST_BATCH + 1
+        self.items = [{"id": i, "name": f"vm-{i}"} for i in range(count)]
+        response = await self.client.get("/items")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.content_type, "application/json")
+        self.assertIsNone(response.content_length)
+        self.assertEqual(json.loads(await response.read()), {"items": self.items})
+
+    async def test_error_while_streaming_aborts_connection(self):
+        """Test that an error after the headers were sent aborts the response."""
+        count = rest_server.STREAM_LIST_THRESHOLD + 1
+        self.items = [{"id": i} for i in range(count - 1)] + [_Unserializable()]
+        with self.assertLogs(rest_server.logger, level="ERROR"):
+            response = await self.client.get("/items")
+            self.assertEqual(response.status, 200)
+            with self.assertRaises(aiohttp.ClientPayloadError):
+                await response.read()
+
+
+class TestRequireJson(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the require_json decorator."""
+
+    async def asyncSetUp(self):
+        self.bodies = []
+
+        @rest_server.require_json
+        async def handler(request):
+            self.bodies.append(request["json_body"])
+            return rest_server.json_response({"status": "ok"})
+
+        app = web.Application()
+        app.router.add_post("/items", handler)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_body_is_decoded_once_for_the_handler(self):
+        """Test that the handler gets the decoded object without reading it again."""
+        with mock.patch.object(
+            rest_server, "read_json", wraps=rest_server.read_json
+        ) as read_json:
+            response = await self.client.post("/items", json={"name": "vm-1"})
+
+        self.assertEqual(response.status, 200)
+        read_json.assert_awaited_once()
+        self.assertEqual(self.bodies, [{"name": "vm-1"}])
+
+    async def test_invalid_bodies_are_rejected(self):
+        """Test that bodies which are not a JSON object get a 400 response."""
+        for body in (b"", b"{not json", b"[1, 2]", b'"name"'):
+            with self.subTest(body=body):
+                response = await self.client.post(
+                    "/items", data=body, headers={"Content-Type": "application/json"}
+                )
+                self.assertEqual(response.status, 400)
+                self.assertEqual(await response.json(), {"error": "Invalid JSON"})
+        self.assertEqual(self.bodies, [])
+
+
+class _RecordingVMAPI:
+    """Fake VM API recording which threads run each call and how many overlap."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.threads = {}
+        self.kwargs = {}
+
+    def _call(self, name, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.threads.setdefault(name, set()).add(threading.current_thread().name)
+            self.kwargs[name] = kwargs
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return True
+
+    def start_vm(self, name):
+        return self._call("start_vm")
+
+    def stop_vm(self, name, force=False):
+        return self._call("stop_vm", force=force)
+
+    def delete_vm(self, name, delete_disk=True):
+        return self._call("delete_vm", delete_disk=delete_disk)
+
+    def list_vms(self):
+        self._call("list_vms")
+        return []
+
+
+class TestVMExecutors(unittest.IsolatedAsyncioTestCase):
+    """Test cases for running VM operations in the server thread pools."""
+
+    async def asyncSetUp(self):
+        self.server = rest_server.RESTServer("127.0.0.1", 0)
+        self.vm = self.server.api._vm = _RecordingVMAPI()
+        self.client = TestClient(TestServer(self.server.app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.executor.shutdown(wait=True)
+        self.server.write_executor.shutdown(wait=True)
+
+    async def test_mutating_operations_are_serialized(self):
+        """Test that concurrent start/stop/delete requests never overlap."""
+        requests = []
+        for i in range(4):
+            requests.append(self.client.post(f"/api/vm/vm-{i}/start"))
+            requests.append(self.client.post(f"/api/vm/vm-{i}/stop"))
+            requests.append(self.client.delete(f"/api/vm/vm-{i}"))
+        responses = await asyncio.gather(*requests)
+
+        self.assertTrue(all(response.status == 200 for response in responses))
+        self.assertEqual(self.vm.max_active, 1)
+        for name in ("start_vm", "stop_vm", "delete_vm"):
+            for thread_name in self.vm.threads[name]:
+                self.assertTrue(thread_name.startswith("vm-write"), thread_name)
+
+    async def test_read_operations_use_the_shared_pool(self):
+        """Test that read-only calls run on the shared VM thread pool."""
+        responses = await asyncio.gather(
+            *(self.client.get("/api/vm") for _ in range(4))
+        )
+
+        self.assertTrue(all(response.status == 200 for response in responses))
+        for thread_name in self.vm.threads["list_vms"]:
+            self.assertTrue(thread_name.startswith("vm-io"), thread_name)
+
+
+class TestOptionalJsonBody(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the optional request body of stop/delete."""
+
+    async def asyncSetUp(self):
+        self.server = rest_server.RESTServer("127.0.0.1", 0)
+        self.vm = self.server.api._vm = _RecordingVMAPI()
+        self.client = TestClient(TestServer(self.server.app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.executor.shutdown(wait=True)
+        self.server.write_executor.shutdown(wait=True)
+
+    async def test_bodiless_requests_use_defaults_without_reading(self):
+        """Test that requests without a body get the defaults and skip decoding."""
+        with mock.patch.object(rest_server, "read_json") as read_json:
+            stop = await self.client.post("/api/vm/vm-1/stop")
+            delete = await self.client.delete("/api/vm/vm-1")
+
+        self.assertEqual((stop.status, delete.status), (200, 200))
+        read_json.assert_not_called()
+        self.assertEqual(self.vm.kwargs["stop_vm"], {"force": False})
+        self.assertEqual(self.vm.kwargs["delete_vm"], {"delete_disk": True})
+
+    async def test_body_overrides_defaults(self):
+        """Test that parameters sent in the body are used."""
+        await self.client.post("/api/vm/vm-1/stop", json={"force": True})
+        await self.client.delete("/api/vm/vm-1", json={"delete_disk": False})
+
+        self.assertEqual(self.vm.kwargs["stop_vm"], {"force": True})
+        self.assertEqual(self.vm.kwargs["delete_vm"], {"delete_disk": False})
+
+    async def test_invalid_body_is_ignored(self):
+        """Test that a malformed or non-object body falls back to the defaults."""
+        headers = {"Content-Type": "application/json"}
+        stop = await self.client.post(
+            "/api/vm/vm-1/stop", data=b"{not json", headers=headers
+        )
+        delete = await self.client.delete("/api/vm/vm-1", data=b"[1]", headers=headers)
+
+        self.assertEqual((stop.status, delete.status), (200, 200))
+        self.assertEqual(self.vm.kwargs["stop_vm"], {"force": False})
+        self.assertEqual(self.vm.kwargs["delete_vm"], {"delete_disk": True})
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "run_workers requires os.fork()")
+class TestRunWorkers(unittest.TestCase):
+    """Test cases for the multi-process server."""
+
+    def test_workers_serve_and_stop_on_sigterm(self):
+        """Test that all workers serve requests and exit after SIGTERM."""
+        port = _free_port()
+        code = (
+            "from src.api.rest_server import run_workers; "
+            f"run_workers(2, '127.0.0.1', {port})"
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-c", code],
+            cwd=ROOT_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            self.assertTrue(_wait_for_port(port), "server did not start")
+            children = _child_pids(proc.pid)
+            self.assertEqual(len(children), 1)
+
+            for _ in range(4):
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/", timeout=5
+                ) as response:
+                    self.assertEqual(response.status, 200)
+
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=10)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stderr.close()
+
+        self.assertEqual(proc.returncode, 0)
+        # The parent reaps its children, so they must be gone as well
+        for pid in children:
+            self.assertFalse(
+                os.path.exists(f"/proc/{pid}"), f"worker {pid} still running"
+            )
+        with self.assertRaises(OSError):
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+
+    def test_failing_worker_exits_with_error(self):
+        """Test that a worker which fails exits with a non-zero status."""
+        pid = os.fork()
+        if pid == 0:
+            with mock.patch.object(
+                rest_server, "_run", side_effect=RuntimeError("boom")
+            ):
+                with mock.patch.object(rest_server.logger, "exception"):
+                    rest_server._run_child("127.0.0.1", 0, False)
+        _, status = os.waitpid(pid, 0)
+        self.assertTrue(os.WIFEXITED(status))
+        self.assertEqual(os.WEXITSTATUS(status), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()